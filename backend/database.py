@@ -1,14 +1,29 @@
+import atexit
+import functools
 import json
 import os
 import sqlite3
+import threading
+import time
+import uuid
+import weakref
+import zlib
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Generator
+from typing import Any, Generator, Iterator
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, execute_values
+    from psycopg2.pool import ThreadedConnectionPool
     POSTGRES_AVAILABLE = True
 except ImportError:
     POSTGRES_AVAILABLE = False
@@ -16,9 +31,135 @@ except ImportError:
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 DB_PATH = Path(os.environ.get("COLLEGE_DB_PATH", Path(__file__).parent / "college_reports.db"))
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 2))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 30))
+RESULT_COMPRESSION_LEVEL = int(os.environ.get("RESULT_COMPRESSION_LEVEL", 3))
+HISTORY_CACHE_TTL = float(os.environ.get("HISTORY_CACHE_TTL", 0))
+
+SCHEMA_VERSION = 4
+SQLITE_MIGRATED_COLUMNS = {
+    "reports": (("created_by", "TEXT"), ("created_by_email", "TEXT"), ("summary", "TEXT"), ("result_gz", "BLOB")),
+    "users": (
+        ("is_superadmin", "INTEGER DEFAULT 0"),
+        ("can_delete_without_approval", "INTEGER DEFAULT 0"),
+        ("created_by", "TEXT"),
+    ),
+}
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_reports_ts ON reports (timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_del_req_user_status ON delete_requests (user_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_del_req_status_ts ON delete_requests (status, created_at DESC)",
+)
+
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+)
+
+REPORT_COLUMNS = (
+    "id", "report_type", "filename", "result", "timestamp", "created_by", "created_by_email", "summary", "result_gz"
+)
+USER_COLUMNS = (
+    "id", "email", "password", "role", "is_superadmin", "can_delete_without_approval", "created_at", "created_by"
+)
+
+SQL_GET_USER_BY_EMAIL = "SELECT * FROM users WHERE email = ?"
+SQL_GET_USER_BY_ID = "SELECT * FROM users WHERE id = ?"
+SQL_INSERT_USER = f"""
+    INSERT INTO users ({', '.join(USER_COLUMNS)})
+    VALUES ({', '.join('?' * len(USER_COLUMNS))})
+    RETURNING *
+"""
+SQL_GET_REPORT_BY_ID = "SELECT * FROM reports WHERE id = ?"
+SQL_UPDATE_DELETE_REQUEST_STATUS = "UPDATE delete_requests SET status = ? WHERE id = ? AND status = 'pending'"
+
+PREPARED_STATEMENTS = {
+    "stmt_user_by_email": SQL_GET_USER_BY_EMAIL,
+    "stmt_user_by_id": SQL_GET_USER_BY_ID,
+    "stmt_report_by_id": SQL_GET_REPORT_BY_ID,
+    "stmt_update_delete_request_status": SQL_UPDATE_DELETE_REQUEST_STATUS,
+}
+
+
+def loads_json(value: str | bytes) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
+def compress_result(value: Any) -> bytes:
+    data = orjson.dumps(value) if ORJSON_AVAILABLE else json.dumps(value, ensure_ascii=False).encode()
+    return zlib.compress(data, RESULT_COMPRESSION_LEVEL)
+
+
+def load_result(row: dict) -> Any:
+    result_gz = row.get('result_gz')
+    if result_gz is not None:
+        return loads_json(zlib.decompress(result_gz))
+    return loads_json(row['result'])
+
+
+@functools.lru_cache(maxsize=256)
+def _pg_convert(query: str) -> str:
+    parts = query.split("'")
+    parts[::2] = [part.replace("?", "%s") for part in parts[::2]]
+    return "'".join(parts)
+
+
+@functools.lru_cache(maxsize=64)
+def _update_user_sql(keys: tuple[str, ...]) -> str:
+    return f"UPDATE users SET {', '.join(f'{key} = ?' for key in keys)} WHERE id = ?"
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = TTLCache(maxsize=2048, ttl=USER_CACHE_TTL)
+history_cache = TTLCache(maxsize=8, ttl=HISTORY_CACHE_TTL)
 
 
 class DatabaseBackend(ABC):
+    is_postgres: bool = False
+
     @abstractmethod
     @contextmanager
     def connection(self) -> Generator:
@@ -36,66 +177,139 @@ class DatabaseBackend(ABC):
     def fetchall(self, query: str, params: tuple = ()) -> list[dict]:
         pass
 
+    @abstractmethod
+    def fetchiter(self, query: str, params: tuple = (), chunk_size: int = 1000) -> Iterator[dict]:
+        pass
+
     @abstractmethod
     def execute_write(self, query: str, params: tuple = ()) -> int:
         pass
 
+    @abstractmethod
+    def execute_returning(self, query: str, params: tuple = ()) -> dict | None:
+        pass
+
+    @abstractmethod
+    def insert_many(self, table: str, columns: tuple[str, ...], rows: list[tuple]) -> None:
+        pass
+
 
 class SQLiteBackend(DatabaseBackend):
     def __init__(self, db_path: Path):
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
+        self._rw = self._connect(str(self.db_path))
+        self._rw.execute("PRAGMA journal_mode = WAL")
+        self._write_lock = threading.Lock()
+
+        self._read_uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+
+        atexit.register(self.close)
+
+    @staticmethod
+    def _connect(database: str, uri: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            database, uri=uri, check_same_thread=False, isolation_level=None, cached_statements=256
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
     @contextmanager
     def connection(self) -> Generator[sqlite3.Connection, None, None]:
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        try:
-            yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
+        with self._write_lock:
+            self._rw.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._rw
+                self._rw.execute("COMMIT")
+            except Exception:
+                self._rw.execute("ROLLBACK")
+                raise
+
+    @property
+    def _read_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect(self._read_uri, uri=True)
+            self._readers.append(conn)
+        return conn
+
+    @property
+    def journal_mode(self) -> str:
+        return self._rw.execute("PRAGMA journal_mode").fetchone()[0]
+
+    def close(self) -> None:
+        for conn in self._readers:
             conn.close()
+        self._readers.clear()
+        self._rw.close()
 
     def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
-        with self.connection() as conn:
-            return conn.execute(query, params)
+        with self._write_lock:
+            return self._rw.execute(query, params)
 
     def fetchone(self, query: str, params: tuple = ()) -> dict | None:
-        with self.connection() as conn:
-            cursor = conn.execute(query, params)
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        row = self._read_conn.execute(query, params).fetchone()
+        return dict(row) if row else None
 
     def fetchall(self, query: str, params: tuple = ()) -> list[dict]:
-        with self.connection() as conn:
-            cursor = conn.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+        return [dict(row) for row in self._read_conn.execute(query, params)]
+
+    def fetchiter(self, query: str, params: tuple = (), chunk_size: int = 1000) -> Iterator[dict]:
+        cursor = self._read_conn.execute(query, params)
+        while rows := cursor.fetchmany(chunk_size):
+            for row in rows:
+                yield dict(row)
 
     def execute_write(self, query: str, params: tuple = ()) -> int:
+        with self._write_lock:
+            return self._rw.execute(query, params).rowcount
+
+    def execute_returning(self, query: str, params: tuple = ()) -> dict | None:
+        with self._write_lock:
+            rows = self._rw.execute(query, params).fetchall()
+        return dict(rows[0]) if rows else None
+
+    def insert_many(self, table: str, columns: tuple[str, ...], rows: list[tuple]) -> None:
+        placeholders = ", ".join("?" * len(columns))
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
         with self.connection() as conn:
-            cursor = conn.execute(query, params)
-            return cursor.rowcount
+            conn.executemany(query, rows)
 
 
 class PostgreSQLBackend(DatabaseBackend):
+    is_postgres = True
+
     def __init__(self, database_url: str):
         self.database_url = database_url
+        self._pool = ThreadedConnectionPool(min(DB_POOL_MIN, DB_POOL_MAX), DB_POOL_MAX, database_url)
+        self._slots = threading.BoundedSemaphore(DB_POOL_MAX)
+        self._statements = {
+            query: (name, *self._prepared_sql(name, query)) for name, query in PREPARED_STATEMENTS.items()
+        }
+        self._prepared: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        atexit.register(self.close_all)
 
     @contextmanager
     def connection(self) -> Generator:
-        conn = psycopg2.connect(self.database_url)
-        try:
-            yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        with self._slots:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._pool.putconn(conn)
+
+    def close_all(self) -> None:
+        if not self._pool.closed:
+            self._pool.closeall()
 
     def execute(self, query: str, params: tuple = ()) -> Any:
         query = self._convert_placeholders(query)
@@ -105,30 +319,66 @@ class PostgreSQLBackend(DatabaseBackend):
             return cursor
 
     def fetchone(self, query: str, params: tuple = ()) -> dict | None:
-        query = self._convert_placeholders(query)
         with self.connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(query, params)
-            row = cursor.fetchone()
-            return dict(row) if row else None
+            cursor.execute(self._prepare(conn, query), params)
+            return cursor.fetchone()
 
     def fetchall(self, query: str, params: tuple = ()) -> list[dict]:
-        query = self._convert_placeholders(query)
         with self.connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+            cursor.execute(self._prepare(conn, query), params)
+            return cursor.fetchall()
+
+    def fetchiter(self, query: str, params: tuple = (), chunk_size: int = 1000) -> Iterator[dict]:
+        with self.connection() as conn:
+            cursor = conn.cursor(name=f"c_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+            cursor.itersize = chunk_size
+            cursor.execute(self._convert_placeholders(query), params)
+            yield from cursor
 
     def execute_write(self, query: str, params: tuple = ()) -> int:
-        query = self._convert_placeholders(query)
         with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, params)
+            cursor.execute(self._prepare(conn, query), params)
             return cursor.rowcount
 
+    def execute_returning(self, query: str, params: tuple = ()) -> dict | None:
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(self._prepare(conn, query), params)
+            return cursor.fetchone()
+
+    def insert_many(self, table: str, columns: tuple[str, ...], rows: list[tuple]) -> None:
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            execute_values(cursor, query, rows, page_size=1000)
+
+    def _prepare(self, conn, query: str) -> str:
+        statement = self._statements.get(query)
+        if statement is None:
+            return self._convert_placeholders(query)
+
+        name, prepare_sql, execute_sql = statement
+        prepared = self._prepared.setdefault(conn, set())
+        if name not in prepared:
+            with conn.cursor() as cursor:
+                cursor.execute(prepare_sql)
+            prepared.add(name)
+        return execute_sql
+
+    @staticmethod
+    def _prepared_sql(name: str, query: str) -> tuple[str, str]:
+        parts = query.split("?")
+        positional = parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+        if len(parts) == 1:
+            return f"PREPARE {name} AS {positional}", f"EXECUTE {name}"
+        return f"PREPARE {name} AS {positional}", f"EXECUTE {name} ({', '.join(['%s'] * (len(parts) - 1))})"
+
     @staticmethod
     def _convert_placeholders(query: str) -> str:
-        return query.replace("?", "%s")
+        return _pg_convert(query)
 
 
 def get_backend() -> DatabaseBackend:
@@ -150,9 +400,7 @@ def get_db() -> DatabaseBackend:
 def init_db():
     backend = get_db()
 
-    is_postgres = isinstance(backend, PostgreSQLBackend) if POSTGRES_AVAILABLE else False
-
-    if is_postgres:
+    if backend.is_postgres:
         with backend.connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -175,18 +423,35 @@ def init_db():
             )
         """)
 
-    if is_postgres:
-        backend.execute("ALTER TABLE reports ADD COLUMN IF NOT EXISTS created_by TEXT")
-        backend.execute("ALTER TABLE reports ADD COLUMN IF NOT EXISTS created_by_email TEXT")
+
+def migrate_db():
+    backend = get_db()
+    backend.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+
+    row = backend.fetchone("SELECT MAX(version) AS version FROM schema_version")
+    if row and row["version"] is not None and row["version"] >= SCHEMA_VERSION:
+        return
+
+    if backend.is_postgres:
+        with backend.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("ALTER TABLE reports ADD COLUMN IF NOT EXISTS created_by TEXT")
+            cursor.execute("ALTER TABLE reports ADD COLUMN IF NOT EXISTS created_by_email TEXT")
+            cursor.execute("ALTER TABLE reports ADD COLUMN IF NOT EXISTS summary TEXT")
+            cursor.execute("ALTER TABLE reports ADD COLUMN IF NOT EXISTS result_gz BYTEA")
+            for index in INDEXES:
+                cursor.execute(index)
+            cursor.execute("INSERT INTO schema_version (version) VALUES (%s)", (SCHEMA_VERSION,))
     else:
-        try:
-            backend.execute("ALTER TABLE reports ADD COLUMN created_by TEXT")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            backend.execute("ALTER TABLE reports ADD COLUMN created_by_email TEXT")
-        except sqlite3.OperationalError:
-            pass
+        with backend.connection() as conn:
+            for table, columns in SQLITE_MIGRATED_COLUMNS.items():
+                existing = {col[1] for col in conn.execute(f"PRAGMA table_info({table})")}
+                for name, definition in columns:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            for index in INDEXES:
+                conn.execute(index)
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (SCHEMA_VERSION,))
 
 
 class Database:
@@ -194,55 +459,69 @@ class Database:
         init_db()
         self.create_users_table()
         self.create_delete_requests_table()
+        migrate_db()
 
     @staticmethod
     def insert_report(report_data: dict[str, Any]) -> None:
-        backend = get_db()
-        backend.execute_write("""
-            INSERT INTO reports (id, report_type, filename, result, timestamp, created_by, created_by_email)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            report_data['id'],
-            report_data['report_type'],
-            report_data['filename'],
-            json.dumps(report_data['result'], ensure_ascii=False),
-            report_data['timestamp'],
-            report_data.get('created_by'),
-            report_data.get('created_by_email')
-        ))
+        Database.insert_reports([report_data])
 
     @staticmethod
-    def get_all_reports(limit: int = 100) -> list[dict[str, Any]]:
+    def insert_reports(reports: list[dict[str, Any]]) -> None:
+        if not reports:
+            return
+
         backend = get_db()
-        rows = backend.fetchall(
-            "SELECT * FROM reports ORDER BY timestamp DESC LIMIT ?",
-            (limit,)
+        backend.insert_many(
+            "reports",
+            REPORT_COLUMNS,
+            [(
+                report_data['id'],
+                report_data['report_type'],
+                report_data['filename'],
+                '',
+                report_data['timestamp'],
+                report_data.get('created_by'),
+                report_data.get('created_by_email'),
+                report_data.get('summary'),
+                compress_result(report_data['result'])
+            ) for report_data in reports]
         )
+        history_cache.clear()
+
+    @staticmethod
+    def list_reports_metadata(limit: int = 100) -> list[dict[str, Any]]:
+        cached = history_cache.get(limit)
+        if cached is not None:
+            return [dict(row) for row in cached]
+
+        backend = get_db()
+        rows = backend.fetchall("""
+            SELECT id, report_type, filename, timestamp, summary, created_by, created_by_email,
+                   CASE WHEN summary IS NULL THEN result END AS result,
+                   CASE WHEN summary IS NULL THEN result_gz END AS result_gz
+            FROM reports ORDER BY timestamp DESC LIMIT ?
+        """, (limit,))
 
-        reports = []
         for row in rows:
-            reports.append({
-                'id': row['id'],
-                'report_type': row['report_type'],
-                'filename': row['filename'],
-                'result': json.loads(row['result']),
-                'timestamp': row['timestamp'],
-                'created_by': row.get('created_by'),
-                'created_by_email': row.get('created_by_email')
-            })
-        return reports
+            if row['result'] is not None or row['result_gz'] is not None:
+                row['result'] = load_result(row)
+            else:
+                row.pop('result')
+            row.pop('result_gz')
+        history_cache.set(limit, rows)
+        return [dict(row) for row in rows]
 
     @staticmethod
     def get_report_by_id(report_id: str) -> dict[str, Any] | None:
         backend = get_db()
-        row = backend.fetchone("SELECT * FROM reports WHERE id = ?", (report_id,))
+        row = backend.fetchone(SQL_GET_REPORT_BY_ID, (report_id,))
 
         if row:
             return {
                 'id': row['id'],
                 'report_type': row['report_type'],
                 'filename': row['filename'],
-                'result': json.loads(row['result']),
+                'result': load_result(row),
                 'timestamp': row['timestamp'],
                 'created_by': row.get('created_by'),
                 'created_by_email': row.get('created_by_email')
@@ -252,14 +531,16 @@ class Database:
     @staticmethod
     def delete_report(report_id: str) -> bool:
         backend = get_db()
-        deleted = backend.execute_write("DELETE FROM reports WHERE id = ?", (report_id,))
-        return deleted > 0
+        deleted = backend.execute_returning("DELETE FROM reports WHERE id = ? RETURNING id", (report_id,))
+        if deleted is not None:
+            history_cache.clear()
+        return deleted is not None
 
-    def create_users_table(self):
+    @staticmethod
+    def create_users_table():
         backend = get_db()
-        is_postgres = isinstance(backend, PostgreSQLBackend) if POSTGRES_AVAILABLE else False
 
-        if is_postgres:
+        if backend.is_postgres:
             with backend.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
@@ -287,92 +568,144 @@ class Database:
                     created_by TEXT
                 )
             """)
-            self._migrate_users_table()
 
     @staticmethod
-    def _migrate_users_table():
+    def create_user(user_data: dict[str, Any]) -> dict[str, Any]:
         backend = get_db()
-        if isinstance(backend, SQLiteBackend):
-            with backend.connection() as conn:
-                cursor = conn.execute("PRAGMA table_info(users)")
-                columns = [col[1] for col in cursor.fetchall()]
+        row = Database._user_row(user_data)
 
-                if 'is_superadmin' not in columns:
-                    conn.execute("ALTER TABLE users ADD COLUMN is_superadmin INTEGER DEFAULT 0")
-                if 'can_delete_without_approval' not in columns:
-                    conn.execute("ALTER TABLE users ADD COLUMN can_delete_without_approval INTEGER DEFAULT 0")
-                if 'created_by' not in columns:
-                    conn.execute("ALTER TABLE users ADD COLUMN created_by TEXT")
+        try:
+            created = backend.execute_returning(SQL_INSERT_USER, row)
+        except Exception as e:
+            raise Database._user_insert_error(e) from e
+        return Database._cache_user(Database._row_to_user_dict(created))
 
     @staticmethod
-    def create_user(user_data: dict[str, Any]) -> None:
-        password = user_data.get("password") or user_data.get("hashed_password")
-        if not password:
-            raise ValueError("User password is required (password/hashed_password)")
+    def create_users(users: list[dict[str, Any]]) -> None:
+        if not users:
+            return
 
         backend = get_db()
-        is_postgres = isinstance(backend, PostgreSQLBackend) if POSTGRES_AVAILABLE else False
+        rows = [Database._user_row(user_data) for user_data in users]
 
         try:
-            if is_postgres:
-                backend.execute_write("""
-                    INSERT INTO users (id, email, password, role, is_superadmin, can_delete_without_approval, created_at, created_by)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    user_data['id'],
-                    user_data['email'],
-                    password,
-                    user_data.get('role', 'user'),
-                    user_data.get('is_superadmin', False),
-                    user_data.get('can_delete_without_approval', False),
-                    user_data['created_at'],
-                    user_data.get('created_by')
-                ))
-            else:
-                backend.execute_write("""
-                    INSERT INTO users (id, email, password, role, is_superadmin, can_delete_without_approval, created_at, created_by)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    user_data['id'],
-                    user_data['email'],
-                    password,
-                    user_data.get('role', 'user'),
-                    1 if user_data.get('is_superadmin') else 0,
-                    1 if user_data.get('can_delete_without_approval') else 0,
-                    user_data['created_at'],
-                    user_data.get('created_by')
-                ))
+            backend.insert_many("users", USER_COLUMNS, rows)
         except Exception as e:
-            if "UNIQUE" in str(e).upper() or "unique" in str(e).lower():
-                raise ValueError(f"User with this email already exists") from e
-            raise ValueError(str(e)) from e
+            raise Database._user_insert_error(e) from e
+
+    @staticmethod
+    def _user_row(user_data: dict[str, Any]) -> tuple:
+        password = user_data.get("password") or user_data.get("hashed_password")
+        if not password:
+            raise ValueError("User password is required (password/hashed_password)")
+
+        return (
+            user_data['id'],
+            user_data['email'],
+            password,
+            user_data.get('role', 'user'),
+            bool(user_data.get('is_superadmin', False)),
+            bool(user_data.get('can_delete_without_approval', False)),
+            user_data['created_at'],
+            user_data.get('created_by')
+        )
+
+    @staticmethod
+    def _user_insert_error(e: Exception) -> ValueError:
+        if "UNIQUE" in str(e).upper() or "unique" in str(e).lower():
+            return ValueError(f"User with this email already exists")
+        return ValueError(str(e))
+
+    def get_user_by_email(self, email: str, cached: bool = True) -> dict[str, Any] | None:
+        if cached:
+            user = user_cache.get(("email", email))
+            if user is not None:
+                return dict(user)
 
-    def get_user_by_email(self, email: str) -> dict[str, Any] | None:
         backend = get_db()
-        row = backend.fetchone("SELECT * FROM users WHERE email = ?", (email,))
+        row = backend.fetchone(SQL_GET_USER_BY_EMAIL, (email,))
 
         if row:
-            return self._row_to_user_dict(row)
+            return self._cache_user(self._row_to_user_dict(row))
         return None
 
-    def get_user_by_id(self, user_id: str) -> dict[str, Any] | None:
+    def get_user_by_id(self, user_id: str, cached: bool = True) -> dict[str, Any] | None:
+        if cached:
+            user = user_cache.get(("id", user_id))
+            if user is not None:
+                return dict(user)
+
         backend = get_db()
-        row = backend.fetchone("SELECT * FROM users WHERE id = ?", (user_id,))
+        row = backend.fetchone(SQL_GET_USER_BY_ID, (user_id,))
 
         if row:
-            return self._row_to_user_dict(row)
+            return self._cache_user(self._row_to_user_dict(row))
         return None
 
+    def get_users_by_ids(self, user_ids: set[str]) -> dict[str, dict[str, Any]]:
+        users = {}
+        missing = []
+        for user_id in user_ids:
+            cached = user_cache.get(("id", user_id))
+            if cached is not None:
+                users[user_id] = dict(cached)
+            else:
+                missing.append(user_id)
+
+        if missing:
+            backend = get_db()
+            rows = backend.fetchall(
+                f"SELECT * FROM users WHERE id IN ({', '.join('?' * len(missing))})",
+                tuple(missing)
+            )
+            for row in rows:
+                users[row["id"]] = self._cache_user(self._row_to_user_dict(row))
+        return users
+
+    @staticmethod
+    def _cache_user(user: dict[str, Any]) -> dict[str, Any]:
+        user_cache.set(("id", user["id"]), user)
+        user_cache.set(("email", user["email"]), user)
+        return dict(user)
+
+    @staticmethod
+    def _invalidate_user(user: dict | None) -> None:
+        if user:
+            user_cache.pop(("id", user["id"]))
+            user_cache.pop(("email", user["email"]))
+
     def get_all_users(self) -> list[dict[str, Any]]:
         backend = get_db()
-        rows = backend.fetchall("SELECT * FROM users ORDER BY created_at DESC")
+        rows = backend.fetchiter("""
+            SELECT id, email, role, is_superadmin, can_delete_without_approval, created_at, created_by
+            FROM users ORDER BY created_at DESC
+        """)
         return [self._row_to_user_dict(row) for row in rows]
 
+    @staticmethod
+    def _write_cursor(backend: DatabaseBackend, conn: Any) -> tuple[Any, Any]:
+        if backend.is_postgres:
+            return conn.cursor(cursor_factory=RealDictCursor), _pg_convert
+        return conn.cursor(), str
+
+    @staticmethod
+    def _delete_user_and_requests(cursor: Any, convert: Any, user_id: str) -> dict | None:
+        cursor.execute(
+            convert("DELETE FROM delete_requests WHERE user_id = ? OR requested_by = ?"),
+            (user_id, user_id)
+        )
+        cursor.execute(convert("DELETE FROM users WHERE id = ? RETURNING id, email"), (user_id,))
+        return cursor.fetchone()
+
     @staticmethod
     def delete_user(user_id: str) -> bool:
         backend = get_db()
-        deleted = backend.execute_write("DELETE FROM users WHERE id = ?", (user_id,))
-        return deleted > 0
+        with backend.connection() as conn:
+            cursor, convert = Database._write_cursor(backend, conn)
+            deleted = Database._delete_user_and_requests(cursor, convert, user_id)
+
+        Database._invalidate_user(deleted)
+        return deleted is not None
 
     @staticmethod
     def update_user(user_id: str, updates: dict[str, Any]) -> bool:
@@ -380,36 +713,32 @@ class Database:
             return False
 
         backend = get_db()
-        is_postgres = isinstance(backend, PostgreSQLBackend) if POSTGRES_AVAILABLE else False
+        user = backend.fetchone(SQL_GET_USER_BY_ID, (user_id,))
+        if user is None:
+            return False
 
-        set_clauses = []
-        values = []
+        changes = {}
         for key, value in updates.items():
-            if key in ('is_superadmin', 'can_delete_without_approval'):
-                if not is_postgres:
-                    value = 1 if value else 0
-            set_clauses.append(f"{key} = ?")
-            values.append(value)
+            if user.get(key) != value:
+                changes[key] = value
 
-        values.append(user_id)
-        query = f"UPDATE users SET {', '.join(set_clauses)} WHERE id = ?"
+        if not changes:
+            return True
 
-        updated = backend.execute_write(query, tuple(values))
+        updated = backend.execute_write(_update_user_sql(tuple(changes)), (*changes.values(), user_id))
+        Database._invalidate_user(user)
         return updated > 0
 
     @staticmethod
     def _row_to_user_dict(row: dict) -> dict[str, Any]:
-        d = dict(row)
-        d['is_superadmin'] = bool(d.get('is_superadmin', 0))
-        d['can_delete_without_approval'] = bool(d.get('can_delete_without_approval', 0))
-        return d
+        row['is_superadmin'] = row.get('is_superadmin') == 1
+        row['can_delete_without_approval'] = row.get('can_delete_without_approval') == 1
+        return row
 
     @staticmethod
     def create_delete_requests_table():
         backend = get_db()
-        is_postgres = isinstance(backend, PostgreSQLBackend) if POSTGRES_AVAILABLE else False
-
-        if is_postgres:
+        if backend.is_postgres:
             with backend.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
@@ -471,16 +800,33 @@ class Database:
     @staticmethod
     def update_delete_request_status(request_id: str, status: str) -> bool:
         backend = get_db()
-        updated = backend.execute_write(
-            "UPDATE delete_requests SET status = ? WHERE id = ?",
-            (status, request_id)
-        )
+        updated = backend.execute_write(SQL_UPDATE_DELETE_REQUEST_STATUS, (status, request_id))
         return updated > 0
 
     @staticmethod
-    def delete_delete_requests_by_user_id(user_id: str) -> int:
+    def approve_delete_request(request_id: str) -> bool:
         backend = get_db()
-        return backend.execute_write("DELETE FROM delete_requests WHERE user_id = ?", (user_id,))
+        with backend.connection() as conn:
+            cursor, convert = Database._write_cursor(backend, conn)
+            cursor.execute(
+                convert("DELETE FROM delete_requests WHERE id = ? AND status = 'pending' RETURNING user_id"),
+                (request_id,)
+            )
+            claimed = cursor.fetchone()
+            if claimed is None:
+                return False
+
+            deleted = Database._delete_user_and_requests(cursor, convert, claimed["user_id"])
+
+        Database._invalidate_user(deleted)
+        return True
+
+
+_database: Database | None = None
 
 
-db = Database()
+def get_database() -> Database:
+    global _database
+    if _database is None:
+        _database = Database()
+    return _database
@@ -2,15 +2,13 @@ import sys
 import uuid
 from datetime import datetime, timezone
 
-from passlib.context import CryptContext
-
-from database import db
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from database import get_database
+from security import get_password_hash
 
 
 def init_admin():
     print("🔍 Проверка существующих администраторов...")
+    db = get_database()
     
     print("\n📝 Создание главного администратора")
     print("=" * 50)
@@ -33,10 +31,10 @@ def init_admin():
         password = secrets.token_urlsafe(12)
         print(f"🔑 Сгенерирован пароль: {password}")
 
-    hashed_password = pwd_context.hash(password)
+    hashed_password = get_password_hash(password)
 
     admin_user = {
-        "id": str(uuid.uuid4()),
+        "id": uuid.uuid4().hex,
         "email": email,
         "password": hashed_password,
         "role": "admin",
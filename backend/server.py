@@ -1,29 +1,54 @@
-import io
+import asyncio
+import csv
+import functools
+import hashlib
 import logging
 import os
 import re
 import secrets
 import time
 import uuid
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 from contextlib import suppress
 from datetime import datetime, timezone, timedelta
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, BinaryIO
 from enum import StrEnum
 
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from fastapi import FastAPI, APIRouter, File, UploadFile, Form, HTTPException, Depends, status, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.cors import CORSMiddleware
 
-from database import db
+from database import ORJSON_AVAILABLE, TTLCache, get_database
+from security import get_password_hash_async, verify_password_async
+
+try:
+    import python_calamine
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -33,9 +58,15 @@ SECRET_KEY = os.environ.get('JWT_SECRET_KEY', secrets.token_urlsafe(32))
 CSRF_SECRET = os.environ.get('CSRF_SECRET_KEY', secrets.token_urlsafe(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_MB', 20)) * 1024 * 1024
+UPLOAD_CONCURRENCY = int(os.environ.get('UPLOAD_CONCURRENCY', os.cpu_count() or 4))
+UPLOAD_RESULT_CACHE_TTL = float(os.environ.get('UPLOAD_RESULT_CACHE_TTL', 300))
+REDIS_TIMEOUT = float(os.environ.get('REDIS_TIMEOUT', 0.25))
+REDIS_RETRY_INTERVAL = float(os.environ.get('REDIS_RETRY_INTERVAL', 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+upload_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+upload_results = TTLCache(maxsize=32, ttl=UPLOAD_RESULT_CACHE_TTL)
 
 
 class Role(StrEnum):
@@ -56,36 +87,91 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 
+RATE_LIMIT_BODY = '{"detail":"Слишком много запросов. Попробуйте позже."}'.encode()
+
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, requests_per_minute: int = 60):
+    def __init__(self, app, requests_per_minute: int = 60, max_clients: int = 100_000, redis_url: str | None = None):
         super().__init__(app)
         self.requests_per_minute = requests_per_minute
-        self.requests = defaultdict(list)
-    
+        self.max_clients = max_clients
+        self.requests: OrderedDict[str, deque[float]] = OrderedDict()
+        self.redis = None
+        self.redis_retry_at = 0.0
+        if redis_url and REDIS_AVAILABLE:
+            self.redis = aioredis.from_url(
+                redis_url, socket_connect_timeout=REDIS_TIMEOUT, socket_timeout=REDIS_TIMEOUT
+            )
+
     async def dispatch(self, request: Request, call_next):
         client_ip = request.client.host if request.client else "unknown"
-        now = time.time()
-        minute_ago = now - 60
 
-        self.requests[client_ip] = [t for t in self.requests[client_ip] if t > minute_ago]
+        if self.redis is not None and time.monotonic() >= self.redis_retry_at:
+            try:
+                retry_after = await self._retry_after_redis(client_ip)
+            except RedisError as e:
+                logger.warning(
+                    f"Redis rate limiter unavailable, using in-process limits for {REDIS_RETRY_INTERVAL:g}s: {e}"
+                )
+                self.redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+                retry_after = self._retry_after_local(client_ip)
+        else:
+            retry_after = self._retry_after_local(client_ip)
 
-        if len(self.requests[client_ip]) >= self.requests_per_minute:
-            return JSONResponse(
+        if retry_after is not None:
+            return Response(
+                content=RATE_LIMIT_BODY,
                 status_code=429,
-                content={"detail": "Слишком много запросов. Попробуйте позже."}
+                media_type="application/json",
+                headers={"Retry-After": str(retry_after)}
             )
-        
-        self.requests[client_ip].append(now)
+
         response = await call_next(request)
         return response
 
+    async def _retry_after_redis(self, client_ip: str) -> int | None:
+        now = int(time.time())
+        key = f"rl:{client_ip}:{now // 60}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, 60)
+            count, _ = await pipe.execute()
+        if count > self.requests_per_minute:
+            return 60 - now % 60
+        return None
+
+    def _retry_after_local(self, client_ip: str) -> int | None:
+        now = time.monotonic()
+        minute_ago = now - 60
+
+        while self.requests:
+            oldest = next(iter(self.requests.values()))
+            if oldest and oldest[-1] > minute_ago and len(self.requests) <= self.max_clients:
+                break
+            self.requests.popitem(last=False)
+
+        timestamps = self.requests.get(client_ip)
+        if timestamps is None:
+            timestamps = self.requests[client_ip] = deque()
+        else:
+            self.requests.move_to_end(client_ip)
+            while timestamps and timestamps[0] <= minute_ago:
+                timestamps.popleft()
+
+        if len(timestamps) >= self.requests_per_minute:
+            return max(1, int(60 - (now - timestamps[0]))) if timestamps else 60
+
+        timestamps.append(now)
+        return None
+
 
 app = FastAPI(
     title="Academic Reports API",
     description="API для обработки академических отчетов",
     version="2.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
 )
 
 api_router = APIRouter(prefix="/api")
@@ -106,7 +192,7 @@ class UserRole(BaseModel):
 
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
     email: EmailStr
     hashed_password: str
     role: Role = Role.MODERATOR
@@ -137,6 +223,9 @@ class UserResponse(BaseModel):
     created_by: str | None = None
 
 
+user_responses = TypeAdapter(list[UserResponse])
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -145,7 +234,7 @@ class Token(BaseModel):
 
 class DeleteRequest(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
     user_id: str
     requested_by: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
@@ -154,11 +243,12 @@ class DeleteRequest(BaseModel):
 
 class ReportResult(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
     report_type: str
     filename: str
     result: Any
     timestamp: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    summary: str | None = None
     created_by: str | None = None
     created_by_email: EmailStr | None = None
 
@@ -182,13 +272,68 @@ REPORT_LABELS = {
     "student_homework": "Сдача ДЗ: студенты <70%"
 }
 
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+TOPIC_PATTERN = re.compile(r'Урок\s*№?\s*\d+\.?\s*Тема:?\s*.+', re.IGNORECASE)
+TOPIC_KEYWORDS = [
+    'урок', 'тема', 'занятие', 'лекция', 'практика',
+    'лабораторная', 'семинар', 'контрольная', 'самостоятельная',
+    'работа', 'задание', 'повторение', 'изучение', 'введение',
+    'основы', 'понятие', 'определение', 'раздел', 'глава'
+]
+TOPIC_KEYWORDS_RE = re.compile('|'.join(map(re.escape, TOPIC_KEYWORDS)), re.IGNORECASE)
+SUBJECT_PATTERN = re.compile(r'[Пп]редмет:\s*(.+?)(?:\n|\\n|$)')
+FLOAT_HINT_PATTERN = re.compile(r'\d|inf|nan', re.IGNORECASE)
+
+
+def keyword_pattern(*keywords: str) -> re.Pattern:
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+
+STUDENT_NAME_COLUMNS = keyword_pattern('фио', 'студент', 'имя', 'name', 'ученик')
+TEACHER_NAME_COLUMNS = keyword_pattern('фио', 'преподаватель', 'учитель', 'педагог', 'name')
+HOMEWORK_COLUMNS = keyword_pattern('домашн', 'дз', 'homework', 'hw')
+CLASSWORK_COLUMNS = keyword_pattern('классн', 'урок', 'class', 'работа')
+ATTENDANCE_COLUMNS = keyword_pattern('посещаемость', 'attendance', '%', 'процент')
+ISSUED_COLUMNS = keyword_pattern('выдано', 'выдан', 'задано', 'issued')
+CHECKED_COLUMNS = keyword_pattern('проверено', 'проверен', 'checked', 'оценено')
+COMPLETION_NAME_COLUMNS = keyword_pattern('fio', 'фио', 'студент', 'имя', 'name', 'ученик')
+COMPLETION_PERCENT_COLUMNS = keyword_pattern('процент', '% дз', 'percent hw', 'completion')
+
+DAY_ORDER = MappingProxyType({
+    'понедельник': 1, 'вторник': 2, 'среда': 3, 'четверг': 4,
+    'пятница': 5, 'суббота': 6, 'воскресенье': 7
+})
+OCCURRENCE_ORDER = itemgetter("day_order", "time")
+
+PERIOD_LABELS = MappingProxyType({
+    "month": "за месяц",
+    "week": "за неделю",
+    "day": "за день"
+})
+
+PERIOD_START_COLS = MappingProxyType({
+    "month": "Месяц",
+    "week": "Неделя",
+    "day": "День"
+})
+
+UPLOAD_EXTENSIONS = frozenset({".xlsx", ".xlsm", ".xls", ".csv"})
+
+EXCEL_SIGNATURES = ((b"PK\x03\x04", "openpyxl"), (b"\xd0\xcf\x11\xe0", "xlrd"))
+
+CSV_ENCODINGS = ("utf-8-sig", "cp1251")
+CSV_DELIMITERS = ",;\t|"
+CSV_SNIFF_BYTES = 64 * 1024
+
+EXCEL_ENGINES_BY_EXT = MappingProxyType({
+    ".xlsx": "openpyxl",
+    ".xlsm": "openpyxl",
+    ".xls": "xlrd"
+})
+
+EXCEL_ENGINE_KWARGS = MappingProxyType({
+    "openpyxl": {"read_only": True, "data_only": True, "keep_links": False},
+    "xlrd": {"on_demand": True}
+})
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -225,7 +370,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
 
-    user = db.get_user_by_id(user_id)
+    user = get_database().get_user_by_id(user_id, cached=False)
     if user is None:
         raise credentials_exception
     user["hashed_password"] = user.pop("password", "")
@@ -245,6 +390,50 @@ def generate_password(length: int = 12) -> str:
     return secrets.token_urlsafe(length)[:length]
 
 
+def as_str(series: pd.Series) -> pd.Series:
+    return series.astype(object).astype(str)
+
+
+def as_float(series: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+        return np.full(len(series), np.nan), np.zeros(len(series), dtype=bool)
+
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    parsed = ~np.isnan(values)
+    for pos in np.flatnonzero(~parsed & series.notna().to_numpy()):
+        value = series.iat[pos]
+        if isinstance(value, str) and not FLOAT_HINT_PATTERN.search(value):
+            continue
+        with suppress(ValueError, TypeError):
+            values[pos] = float(value)
+            parsed[pos] = True
+    return values, parsed
+
+
+def as_percent(series: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    values, parsed = as_float(as_str(series).str.replace('%', '', regex=False).str.strip())
+    return values, parsed & series.notna().to_numpy()
+
+
+def match_columns(columns: pd.Index, *patterns: re.Pattern) -> tuple[list, ...]:
+    matches = tuple([] for _ in patterns)
+    for col in columns:
+        col_lower = str(col).lower()
+        for pattern, found in zip(patterns, matches):
+            if pattern.search(col_lower):
+                found.append(col)
+    return matches
+
+
+def first_parsed(columns: list[tuple[np.ndarray, np.ndarray]], size: int) -> tuple[np.ndarray, np.ndarray]:
+    if not columns:
+        return np.full(size, np.nan), np.zeros(size, dtype=bool)
+    values = np.column_stack([values for values, _ in columns])
+    parsed = np.column_stack([parsed for _, parsed in columns])
+    first = parsed.argmax(axis=1)
+    return values[np.arange(size), first], parsed.any(axis=1)
+
+
 def process_schedule(df: pd.DataFrame) -> dict:
     result = {
         "title": "Отчет по расписанию групп",
@@ -262,96 +451,91 @@ def process_schedule(df: pd.DataFrame) -> dict:
             group_col = col
             break
 
-    day_order = {
-        'понедельник': 1, 'вторник': 2, 'среда': 3, 'четверг': 4,
-        'пятница': 5, 'суббота': 6, 'воскресенье': 7
-    }
-
     day_cols = []
-    for col in df.columns:
+    for position, col in enumerate(df.columns):
         col_str = str(col).lower()
-        for day_name in day_order.keys():
+        for day_name in DAY_ORDER:
             if day_name in col_str:
-                day_cols.append((col, day_name))
+                day_cols.append((col, position, day_name))
                 break
 
-    logger.info(f"Found group_col: {group_col}, day_cols: {day_cols}")
+    logger.info(f"Found group_col: {group_col}, day_cols: {[(col, day_name) for col, _, day_name in day_cols]}")
 
     groups_data = {}
 
-    for idx, row in df.iterrows():
-        group_name = str(row[group_col]) if group_col and pd.notna(row[group_col]) else None
-        if not group_name or group_name.lower() in ['nan', 'none', '']:
-            continue
+    if group_col is None:
+        day_cols = []
+        group_names = np.empty(0, dtype=object)
+        valid_rows = np.zeros(0, dtype=bool)
+    else:
+        group_values = df[group_col]
+        group_str = as_str(group_values)
+        group_names = group_str.to_numpy()
+        valid_rows = (group_values.notna() & ~group_str.str.lower().isin(['nan', 'none', ''])).to_numpy()
+
+    day_values = []
+    for day_col, position, day_name in day_cols:
+        cells = df.iloc[:, position]
+        cell_str = as_str(cells).str.strip()
+
+        subjects = cell_str.str.extract(SUBJECT_PATTERN, expand=False).str.strip()
+        unmatched = subjects.isna()
+        if unmatched.any():
+            rest = cell_str[unmatched]
+            has_subject_label = rest.str.contains('Предмет:', regex=False) | rest.str.contains('предмет:', regex=False)
+            subjects[unmatched] = rest.str.split('\n').str[0].str.strip().where(~has_subject_label, '')
+        subjects = subjects.where(cells.notna() & (cell_str != ''), '').fillna('')
+
+        if position > 0:
+            time_cells = df.iloc[:, position - 1]
+            time_str = as_str(time_cells)
+            times = time_str.where(time_cells.notna() & time_str.str.contains(':', regex=False), "—")
+        else:
+            times = pd.Series("—", index=df.index)
 
-        if group_name not in groups_data:
-            groups_data[group_name] = {
-                "name": group_name,
-                "disciplines": {},
-                "total": 0
-            }
+        day_values.append((day_name.capitalize(), DAY_ORDER[day_name], subjects.to_numpy(), times.to_numpy()))
+
+    for group_name in dict.fromkeys(group_names[valid_rows].tolist()):
+        groups_data[group_name] = {
+            "name": group_name,
+            "disciplines": defaultdict(list),
+            "total": 0
+        }
 
-        for day_col, day_name in day_cols:
-            cell_value = row.get(day_col)
-            if pd.notna(cell_value) and str(cell_value).strip():
-                cell_str = str(cell_value).strip()
-                
-                subject = None
-                if 'Предмет:' in cell_str or 'предмет:' in cell_str:
-                    match = re.search(r'[Пп]редмет:\s*(.+?)(?:\n|\\n|$)', cell_str)
-                    if match:
-                        subject = match.group(1).strip()
-                else:
-                    subject = cell_str.split('\n')[0].strip()
-
-                if subject:
-                    time_val = "—"
-                    col_idx = list(df.columns).index(day_col)
-                    if col_idx > 0:
-                        time_col = df.columns[col_idx - 1]
-                        time_check = row.get(time_col)
-                        if pd.notna(time_check) and ':' in str(time_check):
-                            time_val = str(time_check)
-
-                    if subject not in groups_data[group_name]["disciplines"]:
-                        groups_data[group_name]["disciplines"][subject] = []
-                    
-                    groups_data[group_name]["disciplines"][subject].append({
-                        "day": day_name.capitalize(),
-                        "day_order": day_order[day_name],
-                        "time": time_val
-                    })
-                    groups_data[group_name]["total"] += 1
-                    result["total_pairs"] += 1
+    if day_values:
+        filled = np.column_stack([subjects != '' for _, _, subjects, _ in day_values]) & valid_rows[:, None]
+        rows, days = np.nonzero(filled)
+        for idx, day_pos in zip(rows.tolist(), days.tolist()):
+            day, day_num, subjects, times = day_values[day_pos]
+            group = groups_data[group_names[idx]]
+            group["disciplines"][subjects[idx]].append({
+                "day": day,
+                "day_order": day_num,
+                "time": times[idx]
+            })
+            group["total"] += 1
+        result["total_pairs"] = len(rows)
 
     for group_name, data in groups_data.items():
         disciplines_list = []
-        
+
         for disc_name, occurrences in data["disciplines"].items():
-            sorted_occurrences = sorted(occurrences, key=lambda x: (x["day_order"], x["time"]))
-            
-            disciplines_list.append({
+            occurrences.sort(key=OCCURRENCE_ORDER)
+            disciplines_list.append((OCCURRENCE_ORDER(occurrences[0]), {
                 "name": disc_name,
                 "count": len(occurrences),
-                "occurrences": [{"day": o["day"], "time": o["time"]} for o in sorted_occurrences]
-            })
-        
-        def get_first_occurrence_key(d):
-            if d["occurrences"]:
-                first = d["occurrences"][0]
-                day_num = day_order.get(first["day"].lower(), 99)
-                return day_num, first["time"]
-            return 99, "99:99"
-        
-        disciplines_list = sorted(disciplines_list, key=get_first_occurrence_key)
-        
+                "occurrences": [{"day": o["day"], "time": o["time"]} for o in occurrences]
+            }))
+
+        disciplines_list.sort(key=itemgetter(0))
+
         result["groups"].append({
             "name": data["name"],
-            "disciplines": disciplines_list,
+            "disciplines": [discipline for _, discipline in disciplines_list],
             "total": data["total"]
         })
 
-    result["groups"] = sorted(result["groups"], key=lambda x: x["name"])
+    result["groups"] = sorted(result["groups"], key=itemgetter("name"))
 
     return result
 
@@ -368,62 +552,55 @@ def process_topics(df: pd.DataFrame) -> dict:
     logger.info(f"Topics report - Available columns: {list(df.columns)}")
     logger.info(f"Topics report - DataFrame shape: {df.shape}")
 
-    pattern = re.compile(r'Урок\s*№?\s*\d+\.?\s*Тема:?\s*.+', re.IGNORECASE)
-    
-    topic_keywords = [
-        'урок', 'тема', 'занятие', 'лекция', 'практика', 
-        'лабораторная', 'семинар', 'контрольная', 'самостоятельная',
-        'работа', 'задание', 'повторение', 'изучение', 'введение',
-        'основы', 'понятие', 'определение', 'раздел', 'глава'
-    ]
-
-    valid_groups = {}
-    invalid_groups = {}
+    valid_groups = defaultdict(list)
+    invalid_groups = defaultdict(lambda: {
+        "reason": "Неверный формат. Ожидается: 'Урок № _. Тема: _'",
+        "occurrences": []
+    })
     
     checked_cells = 0
     matched_keywords = 0
 
-    for col in df.columns:
-        for idx, val in enumerate(df[col]):
-            if pd.notna(val):
-                val_str = str(val).strip()
-                if val_str and len(val_str) > 3:
-                    checked_cells += 1
-                    display_text = val_str[:100] + ("..." if len(val_str) > 100 else "")
-                    
-                    if pattern.match(val_str):
-                        if display_text not in valid_groups:
-                            valid_groups[display_text] = []
-                        valid_groups[display_text].append({
-                            "row": idx + 2,
-                            "column": str(col)
-                        })
-                        result["stats"]["valid_count"] += 1
-                        logger.info(f"  Valid topic found at row {idx + 2}: {display_text[:50]}")
-                    else:
-                        val_lower = val_str.lower()
-                        is_topic = any(keyword in val_lower for keyword in topic_keywords)
-                        
-                        if is_topic:
-                            matched_keywords += 1
-                            if display_text not in invalid_groups:
-                                invalid_groups[display_text] = {
-                                    "reason": "Неверный формат. Ожидается: 'Урок № _. Тема: _'",
-                                    "occurrences": []
-                                }
-                            invalid_groups[display_text]["occurrences"].append({
-                                "row": idx + 2,
-                                "column": str(col)
-                            })
-                            result["stats"]["invalid_count"] += 1
-                            logger.info(f"  Invalid topic found at row {idx + 2}: {display_text[:50]}")
+    for position, col in enumerate(df.columns):
+        values = df.iloc[:, position].reset_index(drop=True)
+        texts = values[values.notna()].astype(str).str.strip()
+        texts = texts[texts.str.len() > 3]
+        if texts.empty:
+            continue
+
+        checked_cells += len(texts)
+        is_valid = texts.str.match(TOPIC_PATTERN)
+        is_topic = ~is_valid & texts.str.contains(TOPIC_KEYWORDS_RE)
+        matched = is_valid | is_topic
+        if not matched.any():
+            continue
+
+        texts = texts[matched]
+        display_texts = texts.str.slice(0, 100).where(texts.str.len() <= 100, texts.str.slice(0, 100) + "...")
+
+        for idx, display_text, valid in zip(texts.index.tolist(), display_texts, is_valid[matched].tolist()):
+            if valid:
+                valid_groups[display_text].append({
+                    "row": idx + 2,
+                    "column": str(col)
+                })
+                result["stats"]["valid_count"] += 1
+                logger.info(f"  Valid topic found at row {idx + 2}: {display_text[:50]}")
+            else:
+                matched_keywords += 1
+                invalid_groups[display_text]["occurrences"].append({
+                    "row": idx + 2,
+                    "column": str(col)
+                })
+                result["stats"]["invalid_count"] += 1
+                logger.info(f"  Invalid topic found at row {idx + 2}: {display_text[:50]}")
 
     logger.info(f"Topics report - Checked {checked_cells} cells total")
     logger.info(f"Topics report - Found {matched_keywords} cells with keywords")
     logger.info(f"Topics report - Valid: {result['stats']['valid_count']}, Invalid: {result['stats']['invalid_count']}")
 
     for text, occurrences in valid_groups.items():
-        sorted_occ = sorted(occurrences, key=lambda x: x["row"])
+        sorted_occ = sorted(occurrences, key=itemgetter("row"))
         result["valid"].append({
             "text": text,
             "count": len(occurrences),
@@ -431,7 +608,7 @@ def process_topics(df: pd.DataFrame) -> dict:
         })
 
     for text, data in invalid_groups.items():
-        sorted_occ = sorted(data["occurrences"], key=lambda x: x["row"])
+        sorted_occ = sorted(data["occurrences"], key=itemgetter("row"))
         result["invalid"].append({
             "text": text,
             "reason": data["reason"],
@@ -455,48 +632,58 @@ def process_students(df: pd.DataFrame) -> dict:
         "stats": {"total_found": 0}
     }
 
-    name_cols = [col for col in df.columns if
-                 any(word in str(col).lower() for word in ['фио', 'студент', 'имя', 'name', 'ученик'])]
-    hw_cols = [col for col in df.columns if
-               any(word in str(col).lower() for word in ['домашн', 'дз', 'homework', 'hw'])]
-    class_cols = [col for col in df.columns if
-                  any(word in str(col).lower() for word in ['классн', 'урок', 'class', 'работа'])]
+    name_cols, hw_cols, class_cols = match_columns(
+        df.columns, STUDENT_NAME_COLUMNS, HOMEWORK_COLUMNS, CLASSWORK_COLUMNS
+    )
 
     name_col = name_cols[0] if name_cols else df.columns[0]
 
-    for idx, row in df.iterrows():
-        student_name = str(row[name_col]) if pd.notna(row[name_col]) else f"Строка {idx + 2}"
-
-        hw_grade = None
-        class_grade = None
-
-        for col in hw_cols:
-            val = row.get(col)
-            if pd.notna(val):
-                with suppress(ValueError, TypeError):
-                    hw_grade = float(val)
-                    break
-
-        for col in class_cols:
-            val = row.get(col)
-            if pd.notna(val):
-                with suppress(ValueError, TypeError):
-                    class_grade = float(val)
-                    break
-
-        if hw_grade is None or class_grade is None:
-            numeric_cols = [col for col in df.columns if
-                            df[col].dtype in ['int64', 'float64'] or str(df[col].dtype) == 'object']
-            for col in numeric_cols:
-                val = row.get(col)
-                if pd.notna(val):
-                    with suppress(ValueError, TypeError):
-                        grade = float(val)
-                        if 0 <= grade <= 5:
-                            if hw_grade is None:
-                                hw_grade = grade
-                            elif class_grade is None:
-                                class_grade = grade
+    size = len(df)
+    parsed_cols = {}
+
+    def parse(col):
+        if col not in parsed_cols:
+            parsed_cols[col] = as_float(df[col])
+        return parsed_cols[col]
+
+    hw_values, has_hw = first_parsed([parse(col) for col in hw_cols], size)
+    class_values, has_class = first_parsed([parse(col) for col in class_cols], size)
+
+    incomplete = ~(has_hw & has_class)
+    if incomplete.any():
+        numeric_cols = list(df.select_dtypes(include=[np.number, 'object']).columns)
+        if numeric_cols:
+            values = np.column_stack([parse(col)[0] for col in numeric_cols])
+            in_range = np.column_stack([parse(col)[1] for col in numeric_cols])
+            in_range &= (values >= 0) & (values <= 5)
+            rows = np.arange(size)
+
+            first = in_range.argmax(axis=1)
+            has_first = in_range.any(axis=1)
+            in_range[rows, first] = False
+            second = in_range.argmax(axis=1)
+            has_second = in_range.any(axis=1)
+
+            fill_hw = incomplete & ~has_hw & has_first
+            hw_values = np.where(fill_hw, values[rows, first], hw_values)
+            class_source = np.where(fill_hw, second, first)
+            class_found = np.where(fill_hw, has_second, has_first)
+            fill_class = incomplete & ~has_class & class_found
+            class_values = np.where(fill_class, values[rows, class_source], class_values)
+            has_hw = has_hw | fill_hw
+            has_class = has_class | fill_class
+
+    hw_grades = np.where(has_hw, hw_values, np.nan)
+    class_grades = np.where(has_class, class_values, np.nan)
+    flagged = np.flatnonzero((has_hw & (hw_grades == 1)) | (has_class & (class_grades < 3)))
+
+    names = df[name_col]
+    name_notna = names.notna().to_numpy()
+    labels = df.index
+    for pos in flagged.tolist():
+        student_name = str(names.iat[pos]) if name_notna[pos] else f"Строка {labels[pos] + 2}"
+        hw_grade = float(hw_grades[pos]) if has_hw[pos] else None
+        class_grade = float(class_grades[pos]) if has_class[pos] else None
 
         issues = []
         if hw_grade is not None and hw_grade == 1:
@@ -504,14 +691,13 @@ def process_students(df: pd.DataFrame) -> dict:
         if class_grade is not None and class_grade < 3:
             issues.append(f"Оценка за классную работу = {class_grade}")
 
-        if issues:
-            result["students"].append({
-                "name": student_name,
-                "hw_grade": hw_grade,
-                "class_grade": class_grade,
-                "issues": issues
-            })
-            result["stats"]["total_found"] += 1
+        result["students"].append({
+            "name": student_name,
+            "hw_grade": hw_grade,
+            "class_grade": class_grade,
+            "issues": issues
+        })
+        result["stats"]["total_found"] += 1
 
     return result
 
@@ -524,68 +710,82 @@ def process_attendance(df: pd.DataFrame) -> dict:
         "stats": {"total_found": 0, "threshold": 40}
     }
 
-    name_cols = [col for col in df.columns if
-                 any(word in str(col).lower() for word in ['фио', 'преподаватель', 'учитель', 'педагог', 'name'])]
-    attendance_cols = [col for col in df.columns if
-                       any(word in str(col).lower() for word in ['посещаемость', 'attendance', '%', 'процент'])]
+    name_cols, attendance_cols = match_columns(df.columns, TEACHER_NAME_COLUMNS, ATTENDANCE_COLUMNS)
 
     name_col = name_cols[0] if name_cols else df.columns[0]
 
-    for idx, row in df.iterrows():
-        teacher_name = str(row[name_col]) if pd.notna(row[name_col]) else None
+    size = len(df)
+    attendance, has_attendance = first_parsed([as_percent(df[col]) for col in attendance_cols], size)
+
+    missing = ~has_attendance
+    if missing.any() and len(df.columns):
+        columns = [as_percent(df.iloc[:, pos]) for pos in range(len(df.columns))]
+        values = np.column_stack([values for values, _ in columns])
+        in_range = np.column_stack([parsed for _, parsed in columns]) & (values >= 0) & (values <= 100)
+        first = in_range.argmax(axis=1)
+        fill = missing & in_range.any(axis=1)
+        attendance = np.where(fill, values[np.arange(size), first], attendance)
+        has_attendance = has_attendance | fill
+
+    names = df[name_col]
+    teacher_names = as_str(names).where(names.notna(), '').tolist()
+    for pos in np.flatnonzero(has_attendance & (attendance < 40)).tolist():
+        teacher_name = teacher_names[pos]
         if not teacher_name or teacher_name.lower() in ['nan', 'none', '']:
             continue
 
-        attendance = None
-
-        for col in attendance_cols:
-            val = row.get(col)
-            if pd.notna(val):
-                with suppress(ValueError, TypeError):
-                    val_str = str(val).replace('%', '').strip()
-                    attendance = float(val_str)
-                    break
-
-        if attendance is None:
-            for col in df.columns:
-                val = row.get(col)
-                if pd.notna(val):
-                    with suppress(ValueError, TypeError):
-                        val_str = str(val).replace('%', '').strip()
-                        num = float(val_str)
-                        if 0 <= num <= 100:
-                            attendance = num
-                            break
-
-        if attendance is not None and attendance < 40:
-            result["teachers"].append({
-                "name": teacher_name,
-                "attendance": round(attendance, 1),
-                "status": "critical" if attendance < 20 else "warning"
-            })
-            result["stats"]["total_found"] += 1
+        value = float(attendance[pos])
+        result["teachers"].append({
+            "name": teacher_name,
+            "attendance": round(value, 1),
+            "status": "critical" if value < 20 else "warning"
+        })
+        result["stats"]["total_found"] += 1
 
-    result["teachers"] = sorted(result["teachers"], key=lambda x: x["attendance"])
+    result["teachers"] = sorted(result["teachers"], key=itemgetter("attendance"))
     return result
 
 
-def process_homework(df: pd.DataFrame, period: str = "month") -> dict:
-    period_labels = {
-        "month": "за месяц",
-        "week": "за неделю",
-        "day": "за день"
-    }
+@functools.lru_cache(maxsize=128)
+def find_homework_columns(columns: tuple, labels: tuple, period: str) -> tuple[Any, Any]:
+    col_mapping = dict(labels)
+    issued_col = None
+    checked_col = None
+
+    start_col = PERIOD_START_COLS.get(period, "Месяц")
+    found_period = start_col in columns
+
+    if found_period:
+        start = columns.index(start_col)
+        for next_col in columns[start + 1:start + 5]:
+            val_lower = col_mapping.get(next_col, "")
+            if 'выдано' in val_lower or 'выдан' in val_lower:
+                issued_col = next_col
+            elif 'проверено' in val_lower or 'проверен' in val_lower:
+                checked_col = next_col
+
+    if not found_period or (issued_col is None and checked_col is None):
+        for col, val_lower in col_mapping.items():
+            if ISSUED_COLUMNS.search(val_lower):
+                if issued_col is None:
+                    issued_col = col
+            elif CHECKED_COLUMNS.search(val_lower):
+                if checked_col is None:
+                    checked_col = col
+
+    return issued_col, checked_col
 
+
+def process_homework(df: pd.DataFrame, period: str = "month") -> dict:
     result = {
-        "title": f"Отчет по проверке домашних заданий ({period_labels.get(period, period)})",
+        "title": f"Отчет по проверке домашних заданий ({PERIOD_LABELS.get(period, period)})",
         "description": "Преподаватели, чей процент проверки заданий ниже 70%",
         "teachers": [],
         "stats": {"total_found": 0, "threshold": 70},
         "period": period
     }
 
-    name_cols = [col for col in df.columns if
-                 any(word in str(col).lower() for word in ['фио', 'преподаватель', 'учитель', 'педагог', 'name'])]
+    name_cols, = match_columns(df.columns, TEACHER_NAME_COLUMNS)
 
     name_col = name_cols[0] if name_cols else df.columns[0]
 
@@ -601,85 +801,43 @@ def process_homework(df: pd.DataFrame, period: str = "month") -> dict:
 
     logger.info(f"Column mapping from first row: {col_mapping}")
 
-    period_start_cols = {
-        "month": "Месяц",
-        "week": "Неделя",
-        "day": "День"
-    }
-
-    issued_col = None
-    checked_col = None
-
-    start_col = period_start_cols.get(period, "Месяц")
-    found_period = False
-
-    cols_list = list(df.columns)
-    for i, col in enumerate(cols_list):
-        if col == start_col:
-            found_period = True
-            for j in range(i + 1, min(i + 5, len(cols_list))):
-                next_col = cols_list[j]
-                val_lower = col_mapping.get(next_col, "")
-                if 'выдано' in val_lower or 'выдан' in val_lower:
-                    issued_col = next_col
-                elif 'проверено' in val_lower or 'проверен' in val_lower:
-                    checked_col = next_col
-            break
-
-    if not found_period or (issued_col is None and checked_col is None):
-        for col, val_lower in col_mapping.items():
-            if any(word in val_lower for word in ['выдано', 'выдан', 'задано', 'issued']):
-                if issued_col is None:
-                    issued_col = col
-            elif any(word in val_lower for word in ['проверено', 'проверен', 'checked', 'оценено']):
-                if checked_col is None:
-                    checked_col = col
+    issued_col, checked_col = find_homework_columns(tuple(df.columns), tuple(col_mapping.items()), period)
 
     logger.info(f"Found columns for period '{period}' - issued: {issued_col}, checked: {checked_col}")
 
     start_idx = 1 if col_mapping else 0
 
-    for idx, row in df.iloc[start_idx:].iterrows():
-        teacher_name = str(row[name_col]) if pd.notna(row[name_col]) else None
-        if not teacher_name or teacher_name.lower() in ['nan', 'none', '', 'всего']:
-            continue
+    rows = df.iloc[start_idx:]
+    size = len(rows)
+    issued, has_issued = as_float(rows[issued_col]) if issued_col is not None else first_parsed([], size)
+    checked, has_checked = as_float(rows[checked_col]) if checked_col is not None else first_parsed([], size)
 
-        check_percent = None
-        issued = None
-        checked = None
+    valid = has_issued & has_checked & (issued > 0)
+    check_percents = np.full(size, np.nan)
+    np.divide(checked, issued, out=check_percents, where=valid)
+    check_percents *= 100
 
-        if issued_col is not None:
-            val = row.get(issued_col)
-            if pd.notna(val):
-                with suppress(ValueError, TypeError):
-                    issued = float(val)
-
-        if checked_col is not None:
-            val = row.get(checked_col)
-            if pd.notna(val):
-                with suppress(ValueError, TypeError):
-                    checked = float(val)
-
-        if issued is None or issued == 0:
+    names = rows[name_col]
+    teacher_names = as_str(names).where(names.notna(), '').tolist()
+    for pos in np.flatnonzero(valid & (check_percents < 70)).tolist():
+        teacher_name = teacher_names[pos]
+        if not teacher_name or teacher_name.lower() in ['nan', 'none', '', 'всего']:
             continue
 
-        if issued is not None and issued > 0 and checked is not None:
-            check_percent = (checked / issued) * 100
-            issued_int = int(issued) if issued is not None else 0
-            checked_int = int(checked) if checked is not None else 0
-
-        if check_percent is not None and check_percent < 70:
-            result["teachers"].append({
-                "name": teacher_name,
-                "check_percent": round(check_percent, 1),
-                "issued": int(issued) if issued is not None else "—",
-                "checked": int(checked) if checked is not None else "—",
-                "status": "критично" if check_percent < 50 else "низкий",
-                "message":  f"Проверено {checked_int} из {issued_int} заданий ({round(check_percent, 1)}%)"
-            })
-            result["stats"]["total_found"] += 1
+        check_percent = float(check_percents[pos])
+        issued_int = int(issued[pos])
+        checked_int = int(checked[pos])
+        result["teachers"].append({
+            "name": teacher_name,
+            "check_percent": round(check_percent, 1),
+            "issued": issued_int,
+            "checked": checked_int,
+            "status": "критично" if check_percent < 50 else "низкий",
+            "message": f"Проверено {checked_int} из {issued_int} заданий ({round(check_percent, 1)}%)"
+        })
+        result["stats"]["total_found"] += 1
 
-    result["teachers"] = sorted(result["teachers"], key=lambda x: x["check_percent"])
+    result["teachers"] = sorted(result["teachers"], key=itemgetter("check_percent"))
     return result
 
 
@@ -694,61 +852,150 @@ def process_student_homework(df: pd.DataFrame) -> dict:
     logger.info(f"Student homework report - Available columns: {list(df.columns)}")
 
     name_col = None
+    percent_col = None
     for col in df.columns:
         col_lower = str(col).lower()
-        if any(word in col_lower for word in ['fio', 'фио', 'студент', 'имя', 'name', 'ученик']):
+        if name_col is None and COMPLETION_NAME_COLUMNS.search(col_lower):
             name_col = col
+        if percent_col is None and (
+            ('percentage' in col_lower and 'homework' in col_lower)
+            or COMPLETION_PERCENT_COLUMNS.search(col_lower)
+        ):
+            percent_col = col
+        if name_col is not None and percent_col is not None:
             break
     if name_col is None:
         name_col = df.columns[0]
 
-    percent_col = None
-    for col in df.columns:
-        col_lower = str(col).lower()
-        if 'percentage' in col_lower and 'homework' in col_lower:
-            percent_col = col
-            break
-        if any(word in col_lower for word in ['процент', '% дз', 'percent hw', 'completion']):
-            percent_col = col
-            break
-
     logger.info(f"Found columns - name: {name_col}, percent: {percent_col}")
 
-    for idx, row in df.iterrows():
-        student_name = str(row[name_col]) if pd.notna(row[name_col]) else f"Строка {idx + 2}"
+    if percent_col is None:
+        return result
+
+    names = df[name_col]
+    name_strs = as_str(names).where(names.notna(), None)
+    percent_values = df[percent_col]
+    percent_strs = as_str(percent_values).str.replace('%', '', regex=False).str.replace('-', '', regex=False).str.strip()
+    percents, has_percent = as_float(percent_strs.where(percent_strs != '', None))
+    has_percent &= percent_values.notna().to_numpy()
+
+    labels = df.index
+    for pos in np.flatnonzero(has_percent & (percents < 70)).tolist():
+        student_name = name_strs.iat[pos]
+        if student_name is None:
+            student_name = f"Строка {labels[pos] + 2}"
 
         if student_name.lower() in ['nan', 'none', '', 'всего', 'итого', 'total']:
             continue
 
-        completion_percent = None
-
-        if percent_col is not None:
-            val = row.get(percent_col)
-            if pd.notna(val):
-                with suppress(ValueError, TypeError):
-                    val_str = str(val).replace('%', '').replace('-', '').strip()
-                    if val_str:
-                        completion_percent = float(val_str)
-
-        if completion_percent is not None and completion_percent < 70:
-            result["students"].append({
-                "name": student_name,
-                "completion_percent": round(completion_percent, 1)
-            })
-            result["stats"]["total_found"] += 1
+        result["students"].append({
+            "name": student_name,
+            "completion_percent": round(float(percents[pos]), 1)
+        })
+        result["stats"]["total_found"] += 1
 
-    result["students"] = sorted(result["students"], key=lambda x: x["completion_percent"])
+    result["students"] = sorted(result["students"], key=itemgetter("completion_percent"))
     return result
 
 
-REPORT_PROCESSORS = {
-    "schedule": process_schedule,
-    "topics": process_topics,
-    "students": process_students,
-    "attendance": process_attendance,
-    "homework": process_homework,
-    "student_homework": process_student_homework
-}
+SUMMARIZERS = MappingProxyType({
+    "schedule": lambda result: f"Найдено {result.get('total_pairs', 0)} пар",
+    "topics": lambda result: (
+        f"Верных: {result.get('stats', {}).get('valid_count', 0)}, "
+        f"неверных: {result.get('stats', {}).get('invalid_count', 0)}"
+    ),
+    "students": lambda result: f"Найдено {result.get('stats', {}).get('total_found', 0)} студентов",
+    "attendance": lambda result: f"Найдено {result.get('stats', {}).get('total_found', 0)} преподавателей",
+    "homework": lambda result: f"Найдено {result.get('stats', {}).get('total_found', 0)} преподавателей",
+    "student_homework": lambda result: f"Найдено {result.get('stats', {}).get('total_found', 0)} студентов"
+})
+
+
+def build_report_summary(report_type: str, result: dict) -> str:
+    summarizer = SUMMARIZERS.get(report_type)
+    return summarizer(result) if summarizer else ""
+
+
+def excel_engines(header: bytes, ext: str) -> list[str | None]:
+    sniffed = next((engine for signature, engine in EXCEL_SIGNATURES if header.startswith(signature)), None)
+    candidates = [sniffed, EXCEL_ENGINES_BY_EXT.get(ext), "openpyxl", "xlrd"]
+    engines = list(dict.fromkeys(engine for engine in candidates if engine))
+    if CALAMINE_AVAILABLE:
+        engines.insert(0, "calamine")
+    engines.append(None)
+    return engines
+
+
+def upload_digest(source: BinaryIO) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    source.seek(0)
+    for chunk in iter(functools.partial(source.read, 1024 * 1024), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sniff_csv(sample: bytes) -> tuple[str, str]:
+    sample = sample[:sample.rfind(b"\n") + 1] or sample
+    for encoding in CSV_ENCODINGS:
+        try:
+            text = sample.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        return CSV_ENCODINGS[0], ","
+
+    try:
+        return encoding, csv.Sniffer().sniff(text, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return encoding, ","
+
+
+def csv_readers(encoding: str, sep: str) -> list[tuple[str, Any]]:
+    engines = ["pyarrow", "c"] if PYARROW_AVAILABLE else ["c"]
+    attempts = [(engine, encoding, sep) for engine in engines]
+    attempts += [("python", fallback, None) for fallback in CSV_ENCODINGS]
+    return [
+        (f"{engine} ({enc})", functools.partial(pd.read_csv, engine=engine, encoding=enc, sep=delimiter))
+        for engine, enc, delimiter in attempts
+    ]
+
+
+def read_upload(source: BinaryIO, ext: str) -> pd.DataFrame:
+    source.seek(0)
+    if ext == ".csv":
+        readers = csv_readers(*sniff_csv(source.read(CSV_SNIFF_BYTES)))
+    else:
+        readers = [
+            (engine, functools.partial(pd.read_excel, engine=engine, engine_kwargs=EXCEL_ENGINE_KWARGS.get(engine)))
+            for engine in excel_engines(source.read(8), ext)
+        ]
+
+    errors = []
+    for engine, reader in readers:
+        try:
+            logger.info(f"Trying engine: {engine}")
+            source.seek(0)
+            df = reader(source)
+            logger.info(f"Success with engine: {engine}")
+            return df
+        except Exception as engine_error:
+            errors.append(f"{engine}: {engine_error}")
+
+    raise ValueError(f"Не удалось прочитать файл. Ошибки: {'; '.join(errors)}")
+
+
+REPORT_PROCESSORS = MappingProxyType({
+    report_type: (processor, REPORT_LABELS[report_type])
+    for report_type, processor in (
+        ("schedule", process_schedule),
+        ("topics", process_topics),
+        ("students", process_students),
+        ("attendance", process_attendance),
+        ("homework", process_homework),
+        ("student_homework", process_student_homework),
+    )
+})
 
 
 @api_router.get("/")
@@ -758,26 +1005,23 @@ async def root():
 
 @api_router.post("/auth/login")
 async def login(user_login: UserLogin):
-    user = db.get_user_by_email(user_login.email)
+    user = get_database().get_user_by_email(user_login.email, cached=False)
 
-    if not user or not verify_password(user_login.password, user["password"]):
+    if not user or not await verify_password_async(user_login.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль"
         )
 
-    user["hashed_password"] = user.pop("password", "")
-    user_with_defaults = User(**user)
-
     access_token = create_access_token(data={"sub": user["id"]})
-    user_response = UserResponse(**user_with_defaults.model_dump())
+    user_response = UserResponse.model_validate(user)
 
     return Token(access_token=access_token, token_type="bearer", user=user_response)
 
 
 @api_router.get("/auth/me")
 async def get_me(current_user: User = Depends(get_current_user)):
-    return UserResponse(**current_user.model_dump())
+    return UserResponse.model_validate(current_user, from_attributes=True)
 
 
 @api_router.post("/users", response_model=dict)
@@ -791,7 +1035,8 @@ async def create_user(
             detail="Недостаточно прав. Создавать пользователей может только администратор"
         )
 
-    existing_user = db.get_user_by_email(user_create.email)
+    db = get_database()
+    existing_user = db.get_user_by_email(user_create.email, cached=False)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -799,7 +1044,7 @@ async def create_user(
         )
 
     password = generate_password()
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
 
     user = User(
         email=user_create.email,
@@ -827,17 +1072,13 @@ async def list_users(current_user: User = Depends(get_current_user)):
             detail="Недостаточно прав"
         )
 
-    users = db.get_all_users()
-    result = []
-    for u in users:
-        u['hashed_password'] = u.pop('password', '')
-        result.append(UserResponse(**u))
-    return {"users": result}
+    return {"users": get_database().get_all_users()}
 
 
 @api_router.delete("/users/{user_id}")
 async def delete_user(user_id: str, current_user: User = Depends(get_current_user)):
-    target_user = db.get_user_by_id(user_id)
+    db = get_database()
+    target_user = db.get_user_by_id(user_id, cached=False)
 
     if not target_user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
@@ -860,8 +1101,6 @@ async def delete_user(user_id: str, current_user: User = Depends(get_current_use
         if not deleted:
             raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-        db.delete_delete_requests_by_user_id(user_id)
-
         return {"success": True, "message": "Пользователь удален"}
 
     elif current_user.role == Role.MODERATOR:
@@ -902,65 +1141,48 @@ async def delete_user(user_id: str, current_user: User = Depends(get_current_use
 
 @api_router.get("/delete-requests")
 async def list_delete_requests(admin_user: User = Depends(get_admin_user)):
+    db = get_database()
     requests = db.get_all_pending_delete_requests()
+    users = db.get_users_by_ids({req["user_id"] for req in requests} | {req["requested_by"] for req in requests})
+    responses = dict(zip(users, user_responses.validate_python(list(users.values()))))
 
     for req in requests:
-        user = db.get_user_by_id(req["user_id"])
-        requester = db.get_user_by_id(req["requested_by"])
-
-        if user:
-            user['hashed_password'] = user.pop('password', '')
-            req["user"] = UserResponse(**user)
-        else:
-            req["user"] = None
-            
-        if requester:
-            requester['hashed_password'] = requester.pop('password', '')
-            req["requester"] = UserResponse(**requester)
-        else:
-            req["requester"] = None
+        req["user"] = responses.get(req["user_id"])
+        req["requester"] = responses.get(req["requested_by"])
 
     return {"requests": requests}
 
 
-@api_router.post("/delete-requests/{request_id}/approve")
-async def approve_delete_request(request_id: str, admin_user: User = Depends(get_admin_user)):
-    delete_request = db.get_delete_request_by_id(request_id)
-
-    if not delete_request:
-        raise HTTPException(status_code=404, detail="Запрос не найден")
+def delete_request_not_pending(request_id: str) -> HTTPException:
+    if get_database().get_delete_request_by_id(request_id) is None:
+        return HTTPException(status_code=404, detail="Запрос не найден")
+    return HTTPException(status_code=400, detail="Запрос уже обработан")
 
-    if delete_request["status"] != "pending":
-        raise HTTPException(status_code=400, detail="Запрос уже обработан")
 
-    db.delete_user(delete_request["user_id"])
-    db.update_delete_request_status(request_id, "approved")
+@api_router.post("/delete-requests/{request_id}/approve")
+async def approve_delete_request(request_id: str, admin_user: User = Depends(get_admin_user)):
+    if not get_database().approve_delete_request(request_id):
+        raise delete_request_not_pending(request_id)
 
     return {"success": True, "message": "Пользователь удален"}
 
 
 @api_router.post("/delete-requests/{request_id}/reject")
 async def reject_delete_request(request_id: str, admin_user: User = Depends(get_admin_user)):
-    delete_request = db.get_delete_request_by_id(request_id)
-
-    if not delete_request:
-        raise HTTPException(status_code=404, detail="Запрос не найден")
-
-    if delete_request["status"] != "pending":
-        raise HTTPException(status_code=400, detail="Запрос уже обработан")
-
-    db.update_delete_request_status(request_id, "rejected")
+    if not get_database().update_delete_request_status(request_id, "rejected"):
+        raise delete_request_not_pending(request_id)
 
     return {"success": True, "message": "Запрос отклонен"}
 
 
 @api_router.post("/bootstrap/reset-password")
 async def bootstrap_reset_password(email: EmailStr, new_password: str):
-    user = db.get_user_by_email(email)
+    db = get_database()
+    user = db.get_user_by_email(email, cached=False)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    hashed = get_password_hash(new_password)
+    hashed = await get_password_hash_async(new_password)
     updated = db.update_user(user["id"], {"password": hashed})
     if not updated:
          raise HTTPException(status_code=500, detail="Update failed")
@@ -970,7 +1192,7 @@ async def bootstrap_reset_password(email: EmailStr, new_password: str):
 
 @api_router.get("/bootstrap/list-users")
 async def bootstrap_list_users():
-    users = db.get_all_users()
+    users = get_database().get_all_users()
     return [
                 {
                             "id": u.get("id"),
@@ -987,7 +1209,7 @@ async def update_delete_permission(
     can_delete_without_approval: bool,
     admin_user: User = Depends(get_admin_user)
 ):
-    updated = db.update_user(user_id, {"can_delete_without_approval": can_delete_without_approval})
+    updated = get_database().update_user(user_id, {"can_delete_without_approval": can_delete_without_approval})
 
     if not updated:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
@@ -997,62 +1219,56 @@ async def update_delete_permission(
 
 @api_router.post("/reports/upload")
 async def upload_and_process(
+        request: Request,
         file: UploadFile = File(...),
         report_type: str = Form(...),
         period: str = Form(default="month"),
         current_user: User = Depends(get_current_user)
 ):
-    if report_type not in REPORT_PROCESSORS:
+    processor, report_label = REPORT_PROCESSORS.get(report_type, (None, None))
+    if processor is None:
         raise HTTPException(status_code=400, detail=f"Неизвестный тип отчета: {report_type}")
 
-    content = await file.read()
-
-    try:
-        filename = (file.filename or "").lower()
-        ext = Path(filename).suffix
-        logger.info(f"Processing file: {filename}, extension: {ext}, size: {len(content)} bytes")
-
-        df = None
-        errors = []
-
-        engines = ["openpyxl", "xlrd", None]
-        if ext == ".xls":
-            engines = ["xlrd", "openpyxl", None]
+    content_length = request.headers.get("content-length", "")
+    if (content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES) or (file.size or 0) > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Файл слишком большой. Максимальный размер: {MAX_UPLOAD_BYTES // (1024 * 1024)} МБ"
+        )
 
-        for engine in engines:
-            try:
-                logger.info(f"Trying engine: {engine}")
-                df = pd.read_excel(io.BytesIO(content), engine=engine)
-                logger.info(f"Success with engine: {engine}")
-                break
-            except Exception as engine_error:
-                errors.append(f"{engine}: {engine_error}")
-                continue
+    filename = (file.filename or "").lower()
+    ext = Path(filename).suffix
+    if ext not in UPLOAD_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Неподдерживаемый формат файла: {ext or filename}")
 
-        if df is None:
-            raise ValueError(f"Не удалось прочитать файл. Ошибки: {'; '.join(errors)}")
+    try:
+        logger.info(f"Processing file: {filename}, extension: {ext}, size: {file.size} bytes")
 
-        processor = REPORT_PROCESSORS[report_type]
+        kwargs = {"period": period} if report_type == "homework" else {}
 
-        if report_type == "homework":
-            result_data = processor(df, period=period)
-        else:
-            result_data = processor(df)
+        async with upload_semaphore:
+            cache_key = (report_type, ext, kwargs.get("period"), await asyncio.to_thread(upload_digest, file.file))
+            result_data = upload_results.get(cache_key)
+            if result_data is None:
+                df = await asyncio.to_thread(read_upload, file.file, ext)
+                result_data = await asyncio.to_thread(processor, df, **kwargs)
+                upload_results.set(cache_key, result_data)
 
         report = ReportResult(
             report_type=report_type,
             filename=file.filename,
             result=result_data,
+            summary=build_report_summary(report_type, result_data),
             created_by=current_user.id,
             created_by_email=current_user.email
         )
 
-        db.insert_report(report.model_dump())
+        await asyncio.to_thread(get_database().insert_report, report.model_dump())
 
         return {
             "id": report.id,
             "report_type": report.report_type,
-            "report_label": REPORT_LABELS.get(report_type, report_type),
+            "report_label": report_label,
             "filename": report.filename,
             "result": result_data,
             "timestamp": report.timestamp,
@@ -1067,27 +1283,13 @@ async def upload_and_process(
 
 @api_router.get("/reports/history")
 async def get_report_history(current_user: User = Depends(get_current_user)):
-    reports = db.get_all_reports(limit=100)
+    reports = get_database().list_reports_metadata(limit=100)
 
     history = []
     for r in reports:
-        result = r.get("result", {})
-
-        if r["report_type"] == "schedule":
-            summary = f"Найдено {result.get('total_pairs', 0)} пар"
-        elif r["report_type"] == "topics":
-            stats = result.get("stats", {})
-            summary = f"Верных: {stats.get('valid_count', 0)}, неверных: {stats.get('invalid_count', 0)}"
-        elif r["report_type"] == "students":
-            summary = f"Найдено {result.get('stats', {}).get('total_found', 0)} студентов"
-        elif r["report_type"] == "attendance":
-            summary = f"Найдено {result.get('stats', {}).get('total_found', 0)} преподавателей"
-        elif r["report_type"] == "homework":
-            summary = f"Найдено {result.get('stats', {}).get('total_found', 0)} преподавателей"
-        elif r["report_type"] == "student_homework":
-            summary = f"Найдено {result.get('stats', {}).get('total_found', 0)} студентов"
-        else:
-            summary = ""
+        summary = r.get("summary")
+        if summary is None:
+            summary = build_report_summary(r["report_type"], r.get("result", {}))
 
         history.append({
             "id": r["id"],
@@ -1105,7 +1307,7 @@ async def get_report_history(current_user: User = Depends(get_current_user)):
 
 @api_router.get("/reports/{report_id}")
 async def get_report(report_id: str, current_user: User = Depends(get_current_user)):
-    report = db.get_report_by_id(report_id)
+    report = get_database().get_report_by_id(report_id)
 
     if not report:
         raise HTTPException(status_code=404, detail="Отчет не найден")
@@ -1115,12 +1317,13 @@ async def get_report(report_id: str, current_user: User = Depends(get_current_us
 
 @api_router.post("/bootstrap/admin")
 async def bootstrap_admin(email: EmailStr, password: str):
-    existing = db.get_user_by_email(email)
+    db = get_database()
+    existing = db.get_user_by_email(email, cached=False)
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    user_id = str(uuid.uuid4())
-    hashed = get_password_hash(password)
+    user_id = uuid.uuid4().hex
+    hashed = await get_password_hash_async(password)
 
     db.create_user({
         "id": user_id,
@@ -1139,7 +1342,7 @@ async def bootstrap_admin(email: EmailStr, password: str):
 
 @api_router.delete("/reports/{report_id}")
 async def delete_report(report_id: str, current_user: User = Depends(get_current_user)):
-    deleted = db.delete_report(report_id)
+    deleted = get_database().delete_report(report_id)
     
     if not deleted:
         raise HTTPException(status_code=404, detail="Отчет не найден")
@@ -1147,14 +1350,17 @@ async def delete_report(report_id: str, current_user: User = Depends(get_current
     return {"success": True, "message": "Отчет удален"}
 
 
+HEALTH_BODY = b'{"status":"ok"}'
+
+
 @api_router.get("/health")
 async def health():
-    return {"status": "ok"}
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
 
 app.add_middleware(SecurityHeadersMiddleware)
 
-app.add_middleware(RateLimitMiddleware, requests_per_minute=120)
+app.add_middleware(RateLimitMiddleware, requests_per_minute=120, redis_url=os.environ.get('REDIS_URL'))
 
 CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
 CORS_ORIGINS = [origin.strip() for origin in CORS_ORIGINS if origin.strip()]
@@ -1165,6 +1371,7 @@ app.add_middleware(
     allow_origins=CORS_ORIGINS,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    max_age=int(os.environ.get('CORS_MAX_AGE', 86400)),
 )
 
 app.include_router(api_router)
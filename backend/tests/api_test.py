@@ -5,16 +5,19 @@ import uuid
 from io import BytesIO
 
 import pandas as pd
+import pytest
 from fastapi.testclient import TestClient
 
+from security import get_password_hash
+
 
 def load_server(tmp_path):
     os.environ["COLLEGE_DB_PATH"] = str(tmp_path / "test.db")
 
-    if "backend.database" in sys.modules:
-        importlib.reload(sys.modules["backend.database"])
+    if "database" in sys.modules:
+        importlib.reload(sys.modules["database"])
     else:
-        importlib.import_module("backend.database")
+        importlib.import_module("database")
 
     if "backend.server" in sys.modules:
         importlib.reload(sys.modules["backend.server"])
@@ -27,11 +30,11 @@ def load_server(tmp_path):
 def create_admin(server_module):
     user_id = str(uuid.uuid4())
     password = "password123"
-    server_module.db.create_user(
+    server_module.get_database().create_user(
         {
             "id": user_id,
             "email": "admin@example.com",
-            "password": server_module.get_password_hash(password),
+            "password": get_password_hash(password),
             "role": "admin",
             "is_superadmin": True,
             "can_delete_without_approval": True,
@@ -99,4 +102,125 @@ def test_reports_flow(tmp_path):
     assert get_response.status_code == 200
 
     delete_response = client.delete(f"/api/reports/{report_id}", headers=headers)
-    assert delete_response.status_code == 200
\ No newline at end of file
+    assert delete_response.status_code == 200
+
+@pytest.mark.parametrize(
+    ("encoding", "sep"),
+    [
+        ("utf-8-sig", ","),
+        ("utf-8", ";"),
+        ("cp1251", ","),
+        ("cp1251", ";"),
+        ("cp1251", "\t"),
+    ],
+)
+def test_upload_csv_encodings_and_delimiters(tmp_path, encoding, sep):
+    server = load_server(tmp_path)
+    client = TestClient(server.app)
+
+    _, token = create_admin(server)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    rows = [["ФИО", "Посещаемость"], ["Иванов Иван", "30%"], ["Петров Пётр", "80%"], ["Сидоров Сидор", "15%"]]
+    content = "\n".join(sep.join(row) for row in rows).encode(encoding)
+
+    upload_response = client.post(
+        "/api/reports/upload",
+        data={"report_type": "attendance"},
+        files={"file": ("attendance.csv", BytesIO(content), "text/csv")},
+        headers=headers,
+    )
+    assert upload_response.status_code == 200
+    teachers = upload_response.json()["result"]["teachers"]
+    assert [(t["name"], t["attendance"]) for t in teachers] == [("Сидоров Сидор", 15.0), ("Иванов Иван", 30.0)]
+
+
+def test_rate_limit(tmp_path):
+    server = load_server(tmp_path)
+    app = server.FastAPI()
+    app.add_middleware(server.RateLimitMiddleware, requests_per_minute=2)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    client = TestClient(app)
+
+    assert client.get("/ping").status_code == 200
+    assert client.get("/ping").status_code == 200
+    limited_response = client.get("/ping")
+    assert limited_response.status_code == 429
+    assert 1 <= int(limited_response.headers["Retry-After"]) <= 60
+
+
+class FakeRedisPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.keys = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def incr(self, key):
+        self.keys.append(key)
+
+    def expire(self, key, seconds):
+        pass
+
+    async def execute(self):
+        self.redis.calls += 1
+        if self.redis.error is not None:
+            raise self.redis.error
+        key = self.keys[0]
+        self.redis.counts[key] = self.redis.counts.get(key, 0) + 1
+        return [self.redis.counts[key], True]
+
+
+class FakeRedis:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+        self.counts = {}
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self)
+
+
+def rate_limited_client(server, fake_redis, monkeypatch):
+    monkeypatch.setattr(server, "REDIS_AVAILABLE", True)
+    monkeypatch.setattr(server.aioredis, "from_url", lambda *args, **kwargs: fake_redis)
+    app = server.FastAPI()
+    app.add_middleware(server.RateLimitMiddleware, requests_per_minute=2, redis_url="redis://redis:6379")
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_rate_limit_redis(tmp_path, monkeypatch):
+    server = load_server(tmp_path)
+    fake_redis = FakeRedis()
+    client = rate_limited_client(server, fake_redis, monkeypatch)
+
+    assert client.get("/ping").status_code == 200
+    assert client.get("/ping").status_code == 200
+    limited_response = client.get("/ping")
+    assert limited_response.status_code == 429
+    assert 1 <= int(limited_response.headers["Retry-After"]) <= 60
+    assert fake_redis.calls == 3
+
+
+def test_rate_limit_redis_failure_falls_back_and_backs_off(tmp_path, monkeypatch):
+    server = load_server(tmp_path)
+    fake_redis = FakeRedis(error=server.RedisError("connection timed out"))
+    client = rate_limited_client(server, fake_redis, monkeypatch)
+
+    assert client.get("/ping").status_code == 200
+    assert client.get("/ping").status_code == 200
+    assert client.get("/ping").status_code == 429
+    assert fake_redis.calls == 1
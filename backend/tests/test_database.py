@@ -0,0 +1,197 @@
+import importlib
+import os
+import sqlite3
+import sys
+
+import pytest
+
+
+def load_database(tmp_path):
+    os.environ["COLLEGE_DB_PATH"] = str(tmp_path / "test_database.db")
+    if "backend.database" in sys.modules:
+        importlib.reload(sys.modules["backend.database"])
+    else:
+        importlib.import_module("backend.database")
+    return sys.modules["backend.database"]
+
+
+def make_backend(tmp_path):
+    database = load_database(tmp_path)
+    backend = database.SQLiteBackend(tmp_path / "test_backend.db")
+    backend.execute("CREATE TABLE items (id TEXT PRIMARY KEY, value TEXT)")
+    return backend
+
+
+def test_sqlite_backend_reuses_connections(tmp_path):
+    backend = make_backend(tmp_path)
+
+    backend.execute_write("INSERT INTO items (id, value) VALUES (?, ?)", ("a", "1"))
+    backend.execute_write("INSERT INTO items (id, value) VALUES (?, ?)", ("b", "2"))
+
+    assert backend.fetchone("SELECT * FROM items WHERE id = ?", ("a",)) == {"id": "a", "value": "1"}
+    assert len(backend.fetchall("SELECT * FROM items")) == 2
+    backend.close()
+
+
+def test_sqlite_backend_rolls_back_failed_transaction(tmp_path):
+    backend = make_backend(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        with backend.connection() as conn:
+            conn.execute("INSERT INTO items (id, value) VALUES (?, ?)", ("a", "1"))
+            raise RuntimeError("boom")
+
+    assert backend.fetchall("SELECT * FROM items") == []
+    backend.close()
+
+
+def test_sqlite_backend_uses_wal(tmp_path):
+    backend = make_backend(tmp_path)
+
+    assert backend.journal_mode == "wal"
+    backend.close()
+
+
+def test_sqlite_backend_insert_many(tmp_path):
+    backend = make_backend(tmp_path)
+
+    backend.insert_many("items", ("id", "value"), [("a", "1"), ("b", "2"), ("c", "3")])
+
+    assert [row["id"] for row in backend.fetchall("SELECT id FROM items ORDER BY id")] == ["a", "b", "c"]
+    backend.close()
+
+
+def test_user_cache_invalidated_on_update(tmp_path):
+    database = load_database(tmp_path)
+    database.get_database().create_user(
+        {
+            "id": "u1",
+            "email": "user@example.com",
+            "password": "hash",
+            "role": "user",
+            "created_at": "2024-01-01T00:00:00+00:00",
+        }
+    )
+
+    assert database.get_database().get_user_by_email("user@example.com")["role"] == "user"
+    database.get_database().get_user_by_id("u1")["role"] = "mutated"
+    assert database.get_database().get_user_by_id("u1")["role"] == "user"
+
+    assert database.get_database().update_user("u1", {"role": "moderator"})
+    assert database.get_database().get_user_by_email("user@example.com")["role"] == "moderator"
+    assert database.get_database().update_user("u1", {"role": "moderator"})
+    assert not database.get_database().update_user("missing", {"role": "moderator"})
+
+    database.get_db().execute_write("UPDATE users SET role = ? WHERE id = ?", ("admin", "u1"))
+    assert database.get_database().get_user_by_id("u1")["role"] == "moderator"
+    assert database.get_database().get_user_by_id("u1", cached=False)["role"] == "admin"
+    assert database.get_database().get_user_by_email("user@example.com")["role"] == "admin"
+
+    database.get_database().delete_user("u1")
+    assert database.get_database().get_user_by_id("u1") is None
+
+
+def test_sqlite_backend_fetchiter(tmp_path):
+    backend = make_backend(tmp_path)
+    backend.insert_many("items", ("id", "value"), [(str(i), str(i)) for i in range(5)])
+
+    rows = backend.fetchiter("SELECT id FROM items ORDER BY id", chunk_size=2)
+
+    assert [row["id"] for row in rows] == ["0", "1", "2", "3", "4"]
+    backend.close()
+
+
+def test_history_cache_invalidated_on_insert_and_delete(tmp_path, monkeypatch):
+    monkeypatch.setenv("HISTORY_CACHE_TTL", "10")
+    database = load_database(tmp_path)
+    assert database.history_cache.ttl == 10
+    report = {
+        "id": "r1",
+        "report_type": "topics",
+        "filename": "topics.xlsx",
+        "result": {},
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "summary": "Верных: 0, неверных: 0",
+    }
+
+    assert database.get_database().list_reports_metadata(limit=10) == []
+    database.get_database().insert_report(report)
+    assert [row["id"] for row in database.get_database().list_reports_metadata(limit=10)] == ["r1"]
+
+    database.get_database().delete_report("r1")
+    assert database.get_database().list_reports_metadata(limit=10) == []
+
+
+def test_approve_delete_request_removes_user_once(tmp_path):
+    database = load_database(tmp_path)
+    db = database.get_database()
+    for user_id in ("admin", "target"):
+        db.create_user(
+            {
+                "id": user_id,
+                "email": f"{user_id}@example.com",
+                "password": "hash",
+                "role": "admin",
+                "created_at": "2024-01-01T00:00:00+00:00",
+            }
+        )
+    db.create_delete_request(
+        {"id": "req", "user_id": "target", "requested_by": "admin", "created_at": "2024-01-01T00:00:00+00:00"}
+    )
+
+    assert db.get_user_by_id("target") is not None
+    assert db.approve_delete_request("req")
+    assert db.get_user_by_id("target") is None
+    assert db.get_delete_request_by_id("req") is None
+    assert not db.approve_delete_request("req")
+
+    db.create_delete_request(
+        {"id": "req2", "user_id": "admin", "requested_by": "admin", "created_at": "2024-01-01T00:00:00+00:00"}
+    )
+    assert db.update_delete_request_status("req2", "rejected")
+    assert not db.update_delete_request_status("req2", "rejected")
+    assert db.get_user_by_id("admin") is not None
+
+
+def test_delete_user_removes_requests_and_keeps_foreign_keys(tmp_path):
+    database = load_database(tmp_path)
+    db = database.get_database()
+    for user_id in ("moderator", "target", "other"):
+        db.create_user(
+            {
+                "id": user_id,
+                "email": f"{user_id}@example.com",
+                "password": "hash",
+                "role": "user",
+                "created_at": "2024-01-01T00:00:00+00:00",
+            }
+        )
+    for request_id, user_id, requested_by, status in (
+        ("by_moderator", "target", "moderator", "pending"),
+        ("rejected", "moderator", "other", "rejected"),
+        ("unrelated", "other", "target", "pending"),
+    ):
+        db.create_delete_request(
+            {
+                "id": request_id,
+                "user_id": user_id,
+                "requested_by": requested_by,
+                "created_at": "2024-01-01T00:00:00+00:00",
+                "status": status,
+            }
+        )
+
+    assert db.delete_user("moderator")
+    assert db.get_delete_request_by_id("by_moderator") is None
+    assert db.get_delete_request_by_id("rejected") is None
+    assert db.get_delete_request_by_id("unrelated")["status"] == "pending"
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.create_delete_request(
+            {"id": "dangling", "user_id": "missing", "requested_by": "other", "created_at": "2024-01-01T00:00:00+00:00"}
+        )
+
+    conn = sqlite3.connect(tmp_path / "test_database.db")
+    foreign_keys = {row[3] for row in conn.execute("PRAGMA foreign_key_list(delete_requests)")}
+    conn.close()
+    assert foreign_keys == {"user_id", "requested_by"}
@@ -2,7 +2,9 @@ import importlib
 import os
 import sys
 
+import numpy as np
 import pandas as pd
+import pytest
 
 
 def load_server(tmp_path):
@@ -89,4 +91,250 @@ def test_process_student_homework_basic(tmp_path):
     result = server.process_student_homework(df)
 
     assert result["stats"]["total_found"] == 1
-    assert result["students"][0]["completion_percent"] == 60.0
\ No newline at end of file
+    assert result["students"][0]["completion_percent"] == 60.0
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (4, 4.0),
+        ("2.5", 2.5),
+        (" 3 ", 3.0),
+        ("45,5", None),
+        ("abc", None),
+        (None, None),
+        (np.nan, None),
+    ],
+)
+def test_as_float(tmp_path, value, expected):
+    server = load_server(tmp_path)
+    values, parsed = server.as_float(pd.Series([value], dtype=object))
+
+    assert parsed[0] == (expected is not None)
+    if expected is not None:
+        assert values[0] == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("30%", 30.0),
+        (" 45.5 % ", 45.5),
+        ("45,5%", None),
+        ("-", None),
+        (80, 80.0),
+        (np.nan, None),
+    ],
+)
+def test_as_percent(tmp_path, value, expected):
+    server = load_server(tmp_path)
+    values, parsed = server.as_percent(pd.Series([value], dtype=object))
+
+    assert parsed[0] == (expected is not None)
+    if expected is not None:
+        assert values[0] == expected
+
+
+def test_match_columns_with_duplicate_and_renamed_headers(tmp_path):
+    server = load_server(tmp_path)
+    columns = pd.Index(["ФИО", "Домашнее задание", "ДЗ", "ДЗ", 5, "Student NAME"])
+
+    names, homework = server.match_columns(columns, server.STUDENT_NAME_COLUMNS, server.HOMEWORK_COLUMNS)
+
+    assert names == ["ФИО", "Student NAME"]
+    assert homework == ["Домашнее задание", "ДЗ", "ДЗ"]
+
+
+def test_process_topics_duplicate_headers_and_nan_rows(tmp_path):
+    server = load_server(tmp_path)
+    long_topic = "Урок №2 Тема " + "x" * 120
+    df = pd.DataFrame(
+        [
+            ["Урок № 1. Тема: Введение", "Лекция по физике"],
+            [np.nan, "abc"],
+            ["урок 5 тема", long_topic],
+            ["Урок № 1. Тема: Введение", "Иванов"],
+        ],
+        columns=["Темы", "Темы"],
+    )
+    result = server.process_topics(df)
+
+    assert result["stats"] == {"valid_count": 3, "invalid_count": 2}
+    assert [(item["text"], item["count"]) for item in result["valid"]] == [
+        ("Урок № 1. Тема: Введение", 2),
+        (long_topic[:100] + "...", 1),
+    ]
+    assert result["valid"][0]["occurrences"] == [{"row": 2, "column": "Темы"}, {"row": 5, "column": "Темы"}]
+    assert [(item["text"], item["occurrences"][0]["row"]) for item in result["invalid"]] == [
+        ("Лекция по физике", 2),
+        ("урок 5 тема", 4),
+    ]
+
+
+def test_process_schedule_nan_groups_and_duplicate_time_headers(tmp_path):
+    server = load_server(tmp_path)
+    df = pd.DataFrame(
+        [
+            ["A-01", "9:00", "Предмет: Физика\nАуд 5", "11:00", "Предмет:"],
+            ["A-01", "10:30", "предмет: Химия", "9:00", "Физика"],
+            [np.nan, "9:00", "Предмет: Био", "", np.nan],
+            ["B-02", "утро", "Физика\nАуд 5", "12:00", "  "],
+            ["nan", "9:00", "Предмет: X", "", "Y"],
+            ["C-03", "9:00", np.nan, "", np.nan],
+        ],
+        columns=["Группа", "Время", "Понедельник", "Время", "Вторник"],
+    )
+    result = server.process_schedule(df)
+
+    assert result["total_pairs"] == 4
+    assert [(group["name"], group["total"]) for group in result["groups"]] == [("A-01", 3), ("B-02", 1), ("C-03", 0)]
+    assert result["groups"][0]["disciplines"] == [
+        {"name": "Химия", "count": 1, "occurrences": [{"day": "Понедельник", "time": "10:30"}]},
+        {
+            "name": "Физика",
+            "count": 2,
+            "occurrences": [{"day": "Понедельник", "time": "9:00"}, {"day": "Вторник", "time": "9:00"}],
+        },
+    ]
+    assert result["groups"][1]["disciplines"] == [
+        {"name": "Физика", "count": 1, "occurrences": [{"day": "Понедельник", "time": "—"}]},
+    ]
+
+
+def test_process_schedule_sparse_cells_and_day_order(tmp_path):
+    server = load_server(tmp_path)
+    df = pd.DataFrame(
+        [
+            ["Химия", "Б-2", "10:00", np.nan, "8:30", "Физика"],
+            [np.nan, "А-1", "9:00", "Физика", "", np.nan],
+            ["Физика", "Б-2", "", "Химия", "9:00", "Химия"],
+            ["", "А-1", "11:00", np.nan, "8:30", "Физика"],
+        ],
+        columns=["Среда", "Группа", "Время", "Пятница", "Время", "Понедельник"],
+    )
+    result = server.process_schedule(df)
+
+    assert result["total_pairs"] == 7
+    assert [(group["name"], group["total"]) for group in result["groups"]] == [("А-1", 2), ("Б-2", 5)]
+    assert result["groups"][0]["disciplines"] == [
+        {
+            "name": "Физика",
+            "count": 2,
+            "occurrences": [{"day": "Понедельник", "time": "8:30"}, {"day": "Пятница", "time": "9:00"}],
+        },
+    ]
+    assert [
+        (discipline["name"], [(o["day"], o["time"]) for o in discipline["occurrences"]])
+        for discipline in result["groups"][1]["disciplines"]
+    ] == [
+        ("Физика", [("Понедельник", "8:30"), ("Среда", "—")]),
+        ("Химия", [("Понедельник", "9:00"), ("Среда", "—"), ("Пятница", "—")]),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        (
+            {"ФИО": ["Студент 1", np.nan, "Студент 3", "Студент 4"], "Оценка": [1, "2", "4,5", "x"], "Итог": [5, 2.5, 1, 3]},
+            [("Студент 1", 1.0, 5.0), ("Строка 3", 2.0, 2.5), ("Студент 3", 1.0, None)],
+        ),
+        (
+            {"ДЗ": ["1", np.nan, "5"], "Классная работа": [4, "2.5", np.nan], "Прочее": [np.nan, 1, 2]},
+            [("1", 1.0, 4.0), ("Строка 3", 2.5, 2.5)],
+        ),
+    ],
+)
+def test_process_students_fixed_frames(tmp_path, data, expected):
+    server = load_server(tmp_path)
+    result = server.process_students(pd.DataFrame(data))
+
+    assert [(s["name"], s["hw_grade"], s["class_grade"]) for s in result["students"]] == expected
+    assert result["stats"]["total_found"] == len(expected)
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        (
+            {"ФИО": ["А", "Б", "В", "Г", np.nan, "Е"], "Посещаемость": ["30%", "45,5%", " 35 % ", "10%", "5%", np.nan]},
+            [("Г", 10.0, "critical"), ("А", 30.0, "warning"), ("В", 35.0, "warning")],
+        ),
+        (
+            {"Преподаватель": ["А", "Б", "В", "Г"], "Часы": [120, "x", 150, 200], "Итог": ["25%", "15", "45,5%", np.nan]},
+            [("Б", 15.0, "critical"), ("А", 25.0, "warning")],
+        ),
+    ],
+)
+def test_process_attendance_fixed_frames(tmp_path, data, expected):
+    server = load_server(tmp_path)
+    result = server.process_attendance(pd.DataFrame(data))
+
+    assert [(t["name"], t["attendance"], t["status"]) for t in result["teachers"]] == expected
+    assert result["stats"]["total_found"] == len(expected)
+
+
+@pytest.mark.parametrize("period", ["week", "month"])
+def test_process_homework_fixed_frame(tmp_path, period):
+    server = load_server(tmp_path)
+    df = pd.DataFrame(
+        [
+            [np.nan, np.nan, "Выдано", "Проверено"],
+            ["Иванов", "", 10, 5],
+            ["Петров", "", "8", "8"],
+            ["Сидоров", "", 0, 0],
+            [np.nan, "", 4, "1"],
+            ["Всего", "", 20, 2],
+            ["Кузнецов", "", "12,5", 1],
+        ],
+        columns=["ФИО", "Неделя", "Кол1", "Кол2"],
+    )
+    result = server.process_homework(df, period)
+
+    assert result["teachers"] == [{
+        "name": "Иванов",
+        "check_percent": 50.0,
+        "issued": 10,
+        "checked": 5,
+        "status": "низкий",
+        "message": "Проверено 5 из 10 заданий (50.0%)"
+    }]
+    assert result["stats"]["total_found"] == 1
+
+
+def test_process_student_homework_fixed_frame(tmp_path):
+    server = load_server(tmp_path)
+    df = pd.DataFrame({
+        "ФИО": ["А", "Б", "В", "Итого", np.nan, "Г", "Д"],
+        "Процент выполнения": ["60%", "45,5", "12-", 10, 50, "-", 69.96],
+    })
+    result = server.process_student_homework(df)
+
+    assert [(s["name"], s["completion_percent"]) for s in result["students"]] == [
+        ("В", 12.0),
+        ("Строка 6", 50.0),
+        ("А", 60.0),
+        ("Д", 70.0),
+    ]
+    assert result["stats"]["total_found"] == 4
+
+
+@pytest.mark.parametrize(
+    ("value", "parsed", "expected"),
+    [
+        ("1_000", True, 1000.0),
+        ("٥", True, 5.0),
+        ("1e3", True, 1000.0),
+        (" nan ", True, np.nan),
+        ("inf", True, np.inf),
+        ("-Infinity", True, -np.inf),
+        ("Иванов", False, np.nan),
+        ("45,5", False, np.nan),
+        (pd.Timestamp("2024-01-01"), False, np.nan),
+    ],
+)
+def test_as_float_matches_float_builtin(tmp_path, value, parsed, expected):
+    server = load_server(tmp_path)
+    values, has_value = server.as_float(pd.Series(["x", value, 1], dtype=object))
+
+    assert has_value.tolist() == [False, parsed, True]
+    np.testing.assert_equal(values[1:], [expected, 1.0])